@@ -1,23 +1,119 @@
+import collections
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import tracemalloc
+import weakref
 import numpy as np
+from autograd_forward import GradNode
+
+_hooks = []  # active instrumentation hooks, see add_hook
+class _GradMode(threading.local):
+    # Per thread, so a no_grad block on one thread never stops recording on another
+    enabled = True  # False inside no_grad: ops compute values without recording a graph
+
+_grad_mode = _GradMode()
+
+def _noop():
+    pass
+
+def _unbroadcast(grad, x):
+    # Sum a broadcast gradient back down to the shape of x.
+    if not isinstance(grad, np.ndarray):
+        return grad
+    shape = np.shape(x)
+    if grad.shape == shape:
+        return grad
+    while grad.ndim > len(shape):
+        grad = grad.sum(axis=0)
+    for axis, size in enumerate(shape):
+        if size == 1 and grad.shape[axis] != 1:
+            grad = grad.sum(axis=axis, keepdims=True)
+    return grad
+
+def _relu(x):
+    if isinstance(x, np.ndarray):
+        return np.where(x > 0, x, 0.0)
+    return x if x > 0 else 0.0
+
+def _sigmoid(x):
+    # exp is only taken of -|x|, so it cannot overflow
+    if isinstance(x, np.ndarray):
+        e = np.exp(-np.abs(x))
+        return np.where(x >= 0, 1 / (1 + e), e / (1 + e))
+    if x < 0:
+        e = np.exp(x)
+        return e / (1 + e)
+    return 1 / (1 + np.exp(-x))
+
+def _logsumexp(z, axis):
+    # shift by the maximum so the largest exp is 1
+    m = np.max(z, axis=axis, keepdims=True)
+    m = np.where(np.isfinite(m), m, 0.0)
+    value = np.squeeze(m, axis) + np.log(np.sum(np.exp(z - m), axis=axis))
+    return float(value) if np.ndim(value) == 0 else value
+
+def _log_softmax(z, axis):
+    shifted = z - np.max(z, axis=axis, keepdims=True)
+    return shifted - np.log(np.sum(np.exp(shifted), axis=axis, keepdims=True))
+
 class Node:
-    def __init__(self, x, grad = 0.0, children=()):
+    # make numpy arrays defer to Node's reflected operators instead of broadcasting over it
+    __array_ufunc__ = None
+    # defaults for value-only nodes made by _value_node, which skip __init__
+    grad = 0.0
+    children = ()
+    op = None
+    arg = None
+    propagate_fn = staticmethod(_noop)
+    _order = None
+    requires_grad = False
+    recorded = False
+
+    def __init__(self, x, grad = 0.0, children=(), op=None, requires_grad=None, placeholder=False):
         self.x = x          # Value of the node
         self.grad = grad    # Gradient of the node
-        self.children = set(children)  # Child nodes
-        self.propagate_fn = lambda: None  # Function to propagate gradients
+        self.children = tuple(children)  # Child nodes, in operand order
+        # Whether backprop computes a gradient for this node: True by default for
+        # leaves, False for constants; an op node requires grad if any operand does.
+        # Propagate functions write no gradient into nodes that do not require it.
+        if requires_grad is None:
+            requires_grad = not self.children
+            for child in self.children:
+                if child.requires_grad:
+                    requires_grad = True
+                    break
+        self.requires_grad = requires_grad
+        # Whether ops on this node are recorded. Ops whose operands are all plain
+        # constants only compute a value; a placeholder leaf is a constant whose value
+        # changes between replays, so the ops on it are recorded without a gradient.
+        self.recorded = requires_grad or placeholder or op is not None
+        self.op = op        # Name of the op that produced the node, None for leaves
+        self.arg = None     # Constant argument of the op (power, reduction axis)
+        self.propagate_fn = _noop  # Function to propagate gradients
+        self._order = None  # Cached topological order of the graph below this node
+        if _hooks:
+            for hook in _hooks:
+                hook.on_node(self)
 
     def _to_node(self, other):
         if isinstance(other, Node):
             return other
         # this means other is a constant
-        return Node(other)
+        return Node(other, requires_grad=False)
 
     def __add__(self, other):
         other = self._to_node(other)
-        next_node = Node(self.x + other.x, 0.0, (self, other))
+        value = self.x + other.x
+        if not (_grad_mode.enabled and (self.recorded or other.recorded)):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (self, other), 'add')
         def propagate():
-            self.grad += next_node.grad
-            other.grad += next_node.grad
+            if self.requires_grad:
+                self.grad += _unbroadcast(next_node.grad, self.x)
+            if other.requires_grad:
+                other.grad += _unbroadcast(next_node.grad, other.x)
         next_node.propagate_fn = propagate
         return next_node
     def __radd__(self, other):
@@ -26,10 +122,15 @@ class Node:
     
     def __mul__(self, other):
         other = self._to_node(other)
-        next_node = Node(self.x * other.x, 0.0, (self, other))
+        value = self.x * other.x
+        if not (_grad_mode.enabled and (self.recorded or other.recorded)):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (self, other), 'mul')
         def propagate():
-            self.grad += other.x * next_node.grad
-            other.grad += self.x * next_node.grad
+            if self.requires_grad:
+                self.grad += _unbroadcast(other.x * next_node.grad, self.x)
+            if other.requires_grad:
+                other.grad += _unbroadcast(self.x * next_node.grad, other.x)
         next_node.propagate_fn = propagate
         return next_node
     def __rmul__(self, other):
@@ -37,10 +138,15 @@ class Node:
     
     def __truediv__(self, other):
         other = self._to_node(other)
-        next_node = Node(self.x / other.x, 0.0, (self, other))
+        value = self.x / other.x
+        if not (_grad_mode.enabled and (self.recorded or other.recorded)):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (self, other), 'div')
         def propagate():
-            self.grad += (1 / other.x) * next_node.grad
-            other.grad += (-self.x / (other.x ** 2)) * next_node.grad
+            if self.requires_grad:
+                self.grad += _unbroadcast((1 / other.x) * next_node.grad, self.x)
+            if other.requires_grad:
+                other.grad += _unbroadcast((-self.x / (other.x ** 2)) * next_node.grad, other.x)
         next_node.propagate_fn = propagate
         return next_node
     def __rtruediv__(self, other):
@@ -48,51 +154,440 @@ class Node:
         return other.__truediv__(self)
     
     def __pow__(self, power):
-        next_node = Node(self.x ** power, 0.0, (self,))
+        value = self.x ** power
+        if not (_grad_mode.enabled and self.recorded):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (self,), 'pow')
+        next_node.arg = power
         def propagate():
             self.grad += power * (self.x ** (power - 1)) * next_node.grad
         next_node.propagate_fn = propagate
         return next_node
     
     def __neg__(self):
-        next_node = Node(-self.x, 0.0, (self,))
+        value = -self.x
+        if not (_grad_mode.enabled and self.recorded):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (self,), 'neg')
         def propagate():
             self.grad += -1 * next_node.grad
         next_node.propagate_fn = propagate
         return next_node
 
-    def _rdag(self, visited, node_list):
-        if self in visited:
-            return
-        visited.add(self)
-        for child in self.children:
-            child._rdag(visited, node_list)
-        node_list.append(self)
+    def __matmul__(self, other):
+        other = self._to_node(other)
+        value = self.x @ other.x
+        if not (_grad_mode.enabled and (self.recorded or other.recorded)):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (self, other), 'matmul')
+        def propagate():
+            a, b, g = np.asarray(self.x), np.asarray(other.x), np.asarray(next_node.grad)
+            # promote vectors to matrices so one rule covers every 1-D/2-D case
+            a2 = a.reshape(1, -1) if a.ndim == 1 else a
+            b2 = b.reshape(-1, 1) if b.ndim == 1 else b
+            g2 = g.reshape(a2.shape[0], b2.shape[1])
+            if self.requires_grad:
+                self.grad += (g2 @ b2.T).reshape(a.shape)
+            if other.requires_grad:
+                other.grad += (a2.T @ g2).reshape(b.shape)
+        next_node.propagate_fn = propagate
+        return next_node
+    def __rmatmul__(self, other):
+        other = self._to_node(other)
+        return other.__matmul__(self)
+
+    def sum(self, axis=None, keepdims=False):
+        value = np.sum(self.x, axis=axis, keepdims=keepdims)
+        if not (_grad_mode.enabled and self.recorded):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (self,), 'sum')
+        next_node.arg = (axis, keepdims)
+        def propagate():
+            g = next_node.grad
+            if axis is not None and not keepdims:
+                g = np.expand_dims(g, axis)
+            self.grad += np.broadcast_to(g, np.shape(self.x))
+        next_node.propagate_fn = propagate
+        return next_node
+
+    def mean(self, axis=None, keepdims=False):
+        total = self.sum(axis, keepdims)
+        return total / (np.size(self.x) // np.size(total.x))
+
+    @staticmethod
+    def dot(inputs, weights):
+        # Fused sum of inputs[i] * weights[i]: a single node whose propagate writes every
+        # operand's gradient, instead of one mul and one add node per term.
+        inputs = [x if isinstance(x, Node) else Node(x, requires_grad=False) for x in inputs]
+        weights = [w if isinstance(w, Node) else Node(w, requires_grad=False) for w in weights]
+        value = sum(x.x * w.x for x, w in zip(inputs, weights))
+        if not (_grad_mode.enabled and any(n.recorded for n in (*inputs, *weights))):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (*inputs, *weights), 'dot')
+        def propagate():
+            g = next_node.grad
+            for x, w in zip(inputs, weights):
+                if x.requires_grad:
+                    x.grad += w.x * g
+                if w.requires_grad:
+                    w.grad += x.x * g
+        next_node.propagate_fn = propagate
+        return next_node
+
+    def _topo_order(self):
+        # Children are fixed when a node is built, so the order below a root never
+        # changes and can be reused by every later backprop from the same root.
+        if self._order is not None:
+            return self._order
+        order = []
+        visited = {self}
+        stack = [(self, iter(self.children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child not in visited:
+                    visited.add(child)
+                    stack.append((child, iter(child.children)))
+                    break
+            else:
+                stack.pop()
+                if node.op is not None and not node.children:
+                    raise _released_error(node)
+                order.append(node)
+        self._order = order
+        return order
 
     def relu(self):
-        if self.x > 0:
-            next_node = Node(self.x, 0.0, (self,))
-            def propagate():
-                self.grad += next_node.grad
-            next_node.propagate_fn = propagate
-            return next_node
-        else:
-            next_node = Node(0.0, 0.0, (self,))
-            def propagate():
-                self.grad += 0.0
-            next_node.propagate_fn = propagate
-            return next_node
-
-    def backprop(self):
-        self.grad = 1.0  # initialize the gradient
-        rdag_list = []
-        self._rdag(set(), rdag_list)
-        for node in reversed(rdag_list):
-            node.propagate_fn()
+        value = _relu(self.x)
+        if not (_grad_mode.enabled and self.recorded):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (self,), 'relu')
+        def propagate():
+            # the mask is read from the input's current value rather than fixed when the
+            # node is built, so a replayed graph takes the right branch for new inputs
+            self.grad += (self.x > 0) * next_node.grad
+        next_node.propagate_fn = propagate
+        return next_node
+
+    def replay(self):
+        # Recompute every value below this root from the current values of its leaves,
+        # reusing the recorded graph instead of building a new one. Values computed from
+        # constants only were never recorded and stay as they are: a leaf whose value
+        # will change must require grad or be a placeholder.
+        for node in self._topo_order():
+            if node.op is not None:
+                if not node.children:
+                    raise _released_error(node)
+                node.x = _FORWARD[node.op](node, *[child.x for child in node.children])
+
+    def backprop(self, retain_graph=False, scheduler=None):
+        # scheduler: a ParallelScheduler to run independent propagate functions on
+        # worker threads; the serial reverse topological order is used otherwise.
+        if self._order is not None:
+            # repeated backprop from this root: clear the previous pass's intermediate gradients
+            for node in self._order:
+                if node.children:
+                    node.grad = 0.0
+                elif node.op is not None:
+                    # released by a backprop from another root since this order was cached
+                    raise _released_error(node)
+        self.grad = np.ones_like(self.x) if isinstance(self.x, np.ndarray) else 1.0  # initialize the gradient
+        order = self._topo_order()
+        if _hooks:
+            return self._backprop_hooked(order, retain_graph)
+        if scheduler is not None:
+            return scheduler.run(self, order, retain_graph)
+        if retain_graph:
+            for node in reversed(order):
+                if node.requires_grad:
+                    node.propagate_fn()
+            return
+        # Release the graph as we go: once a node has passed its gradient on, drop its
+        # closure and child links so the intermediates can be reclaimed right away.
+        self._order = None
+        while order:
+            node = order.pop()
+            if node.requires_grad:
+                node.propagate_fn()
+            if node.children:
+                _release(node)
+
+    def _backprop_hooked(self, order, retain_graph):
+        # Same as backprop, but reports the graph and the time spent in every
+        # propagate_fn to the active hooks. Only taken while a hook is installed.
+        for hook in _hooks:
+            hook.on_backprop(self, order)
+        if not retain_graph:
+            self._order = None
+        for i in range(len(order) - 1, -1, -1):
+            node = order[i] if retain_graph else order.pop()
+            if node.op is not None and node.requires_grad:
+                start = time.perf_counter()
+                node.propagate_fn()
+                elapsed = time.perf_counter() - start
+                for hook in _hooks:
+                    hook.on_propagate(node, elapsed)
+            if not retain_graph and node.children:
+                _release(node)
+
+class ParallelScheduler:
+    # Runs the propagate functions of one backprop on a thread pool. A node is ready
+    # once every node that consumes it has propagated, so its gradient is complete.
+    # A gradient written by several consumers is swapped for a _GradBuffer while the
+    # pass runs: each consumer's += appends its own contribution, and they are summed
+    # when the node becomes ready, so consumers sharing an input (the neurons of a
+    # layer) run at the same time. Nodes whose value has fewer than min_size elements
+    # propagate on the calling thread, since handing them to a thread costs more than
+    # the work; large NumPy ops release the GIL and overlap. Gradients match the
+    # serial order up to floating-point summation order.
+    #     with ParallelScheduler(workers=4) as scheduler:
+    #         loss.backprop(scheduler=scheduler)
+    def __init__(self, workers=None, min_size=4096):
+        self.min_size = min_size
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+
+    def run(self, root, order, retain_graph=False):
+        # pending[node]: consumers of node that have not propagated yet
+        pending = dict.fromkeys(order, 0)
+        for node in order:
+            for child in set(node.children):
+                pending[child] += 1
+        buffers = {}
+        # A gradient that is a property (Parameter's slot in a flat array) cannot hold
+        # a buffer; the consumers of such a node take turns instead.
+        exclusive = set()
+        for node, consumers in pending.items():
+            if consumers > 1 and node.requires_grad:
+                if isinstance(getattr(type(node), 'grad', None), property):
+                    exclusive.add(node)
+                else:
+                    node.grad = buffers[node] = _GradBuffer(node.grad)
+        if not retain_graph:
+            root._order = None
+        waiting = collections.deque([root])
+        running = {}
+        busy = set()  # exclusive children of the running nodes
+        try:
+            while waiting or running:
+                for _ in range(len(waiting)):
+                    node = waiting.popleft()
+                    children = set(node.children)
+                    shared = exclusive.intersection(children) if exclusive else ()
+                    if not node.requires_grad:
+                        # recorded only for replay: nothing to propagate
+                        self._finish(node, children, pending, buffers, waiting, retain_graph)
+                    elif shared and not busy.isdisjoint(shared):
+                        waiting.append(node)
+                    elif np.size(node.x) < self.min_size:
+                        node.propagate_fn()
+                        self._finish(node, children, pending, buffers, waiting, retain_graph)
+                    else:
+                        busy.update(shared)
+                        running[self._pool.submit(node.propagate_fn)] = (node, children, shared)
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        node, children, shared = running.pop(future)
+                        future.result()
+                        busy.difference_update(shared)
+                        self._finish(node, children, pending, buffers, waiting, retain_graph)
+        finally:
+            # after an error, put back every gradient that is still buffered
+            if running:
+                wait(running)
+            for node, buffer in buffers.items():
+                node.grad = buffer.total()
+
+    def _finish(self, node, children, pending, buffers, waiting, retain_graph):
+        if not retain_graph:
+            _release(node)
+        for child in children:
+            pending[child] -= 1
+            if pending[child] == 0:
+                buffer = buffers.pop(child, None)
+                if buffer is not None:
+                    child.grad = buffer.total()
+                if child.children:
+                    waiting.append(child)
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+class _GradBuffer:
+    # Stands in for a node's gradient during a parallel backprop. Propagate functions
+    # do `child.grad += contribution`, which here only appends the contribution
+    # (list.append is atomic), so concurrent writers never race on one value.
+    __slots__ = ('grad', 'contributions')
+
+    def __init__(self, grad):
+        self.grad = grad
+        self.contributions = []
+
+    def __iadd__(self, contribution):
+        self.contributions.append(contribution)
+        return self
+
+    def total(self):
+        grad = self.grad
+        for contribution in self.contributions:
+            grad += contribution
+        return grad
+
+def _release(node):
+    # Drop what backprop no longer needs once node has passed its gradient on; the op
+    # name stays, so a later pass through the node can tell it was released.
+    node.propagate_fn = _noop
+    node.children = ()
+    node._order = None
+
+def _released_error(node):
+    return RuntimeError(f"Trying to backprop through a '{node.op}' node whose graph was already released "
+                        "by an earlier backprop; pass retain_graph=True to that backprop to keep it")
+
+def _value_node(value):
+    # Leaf holding only a value, used by ops under no_grad; everything else comes
+    # from the class defaults, so it costs about as much as the value itself.
+    node = Node.__new__(Node)
+    node.x = value
+    return node
+
+class Hook:
+    # Base class for instrumentation hooks; override the callbacks you need.
+    # Hooks cost nothing while none are installed: Node creation and backprop
+    # only check whether the hook list is empty.
+    def on_node(self, node):
+        # called for every Node created while the hook is installed
+        pass
+
+    def on_backprop(self, root, order):
+        # called at the start of each backprop with its topological order (leaves first)
+        pass
+
+    def on_propagate(self, node, seconds):
+        # called after each op node has passed its gradient to its children
+        pass
+
+def add_hook(hook):
+    _hooks.append(hook)
+    return hook
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+class track_memory(Hook):
+    # Context manager reporting the peak number of live Nodes and the peak bytes
+    # allocated inside the block, e.g. for one training step:
+    #     with track_memory() as stats:
+    #         net.train(inputs, targets)
+    #     stats.peak_nodes, stats.peak_bytes, stats.live_nodes
+    def __enter__(self):
+        self._live = weakref.WeakSet()
+        self.peak_nodes = 0
+        self.peak_bytes = 0
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        self._start_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        add_hook(self)
+        return self
+
+    def on_node(self, node):
+        self._live.add(node)
+        if len(self._live) > self.peak_nodes:
+            self.peak_nodes = len(self._live)
+
+    @property
+    def live_nodes(self):
+        return len(self._live)
+
+    def __exit__(self, *exc_info):
+        remove_hook(self)
+        self.peak_bytes = tracemalloc.get_traced_memory()[1] - self._start_bytes
+        if self._started_tracing:
+            tracemalloc.stop()
+        return False
+
+class profile(Hook):
+    # Context manager counting the nodes created per op, timing propagate_fn per op
+    # and recording the size and depth of every backprop graph inside the block:
+    #     with profile() as prof:
+    #         net.train(inputs, targets)
+    #     print(prof.summary())
+    # Propagate times of checkpoint segments include their recomputation.
+    def __enter__(self):
+        self.node_counts = collections.Counter()
+        self.propagate_counts = collections.Counter()
+        self.propagate_seconds = collections.defaultdict(float)
+        self.backprops = []  # (graph size, depth) per backprop
+        add_hook(self)
+        return self
+
+    def on_node(self, node):
+        self.node_counts[node.op or 'leaf'] += 1
+
+    def on_backprop(self, root, order):
+        # longest path from the root to a leaf, in edges
+        depth = {}
+        for node in order:
+            depth[node] = 1 + max((depth[child] for child in node.children), default=-1)
+        self.backprops.append((len(order), depth[root]))
+
+    def on_propagate(self, node, seconds):
+        self.propagate_counts[node.op] += 1
+        self.propagate_seconds[node.op] += seconds
+
+    def __exit__(self, *exc_info):
+        remove_hook(self)
+        return False
+
+    def summary(self):
+        lines = [f"{'op':<12}{'nodes':>10}{'propagates':>12}{'total ms':>12}{'us/call':>10}"]
+        ops = sorted(set(self.node_counts) | set(self.propagate_counts),
+                     key=lambda op: (-self.propagate_seconds.get(op, 0.0), op))
+        for op in ops:
+            calls = self.propagate_counts[op]
+            seconds = self.propagate_seconds.get(op, 0.0)
+            per_call = f"{seconds / calls * 1e6:10.2f}" if calls else f"{'-':>10}"
+            lines.append(f"{op:<12}{self.node_counts[op]:>10}{calls:>12}{seconds * 1e3:>12.3f}{per_call}")
+        if self.backprops:
+            sizes, depths = zip(*self.backprops)
+            lines.append(f"{len(self.backprops)} backprop(s): graph size max {max(sizes)}, "
+                         f"mean {sum(sizes) / len(sizes):.1f}; depth max {max(depths)}")
+        return "\n".join(lines)
+
+class no_grad:
+    # Inside the block, or a function decorated with @no_grad(), ops only compute
+    # values: they return leaf Nodes and record no children or propagate closures.
+    def __enter__(self):
+        self._previous = _grad_mode.enabled
+        _grad_mode.enabled = False
+        return self
+
+    def __exit__(self, *exc_info):
+        _grad_mode.enabled = self._previous
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with no_grad():
+                return fn(*args, **kwargs)
+        return wrapper
 
 def sin(node):
     if isinstance(node, Node):
-        next_node = Node(np.sin(node.x), 0.0, (node,))
+        value = np.sin(node.x)
+        if not (_grad_mode.enabled and node.recorded):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (node,), 'sin')
         def propagate():
             node.grad += np.cos(node.x) * next_node.grad
         next_node.propagate_fn = propagate
@@ -101,7 +596,10 @@ def sin(node):
 
 def cos(node):
     if isinstance(node, Node):
-        next_node = Node(np.cos(node.x), 0.0, (node,))
+        value = np.cos(node.x)
+        if not (_grad_mode.enabled and node.recorded):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (node,), 'cos')
         def propagate():
             node.grad += -np.sin(node.x) * next_node.grad
         next_node.propagate_fn = propagate
@@ -110,9 +608,279 @@ def cos(node):
 
 def log(node):
     if isinstance(node, Node):
-        next_node = Node(np.log(node.x), 0.0, (node,))
+        value = np.log(node.x)
+        if not (_grad_mode.enabled and node.recorded):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (node,), 'log')
         def propagate():
             node.grad += (1 / node.x) * next_node.grad
         next_node.propagate_fn = propagate
         return next_node
-    return np.log(node)
\ No newline at end of file
+    return np.log(node)
+
+def exp(node):
+    if isinstance(node, Node):
+        value = np.exp(node.x)
+        if not (_grad_mode.enabled and node.recorded):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (node,), 'exp')
+        def propagate():
+            node.grad += next_node.x * next_node.grad
+        next_node.propagate_fn = propagate
+        return next_node
+    return np.exp(node)
+
+def tanh(node):
+    if isinstance(node, Node):
+        value = np.tanh(node.x)
+        if not (_grad_mode.enabled and node.recorded):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (node,), 'tanh')
+        def propagate():
+            node.grad += (1 - next_node.x ** 2) * next_node.grad
+        next_node.propagate_fn = propagate
+        return next_node
+    return np.tanh(node)
+
+def sigmoid(node):
+    if isinstance(node, Node):
+        value = _sigmoid(node.x)
+        if not (_grad_mode.enabled and node.recorded):
+            return _value_node(value)
+        next_node = Node(value, 0.0, (node,), 'sigmoid')
+        def propagate():
+            node.grad += next_node.x * (1 - next_node.x) * next_node.grad
+        next_node.propagate_fn = propagate
+        return next_node
+    return _sigmoid(node)
+
+def _vector_operand(x):
+    # The fused ops below take an array Node (or ndarray), or a list of scalar Nodes
+    # and values taken as one vector. Returns the operand Nodes and whether they
+    # were stacked from a list.
+    if isinstance(x, Node):
+        return (x,), False
+    if isinstance(x, np.ndarray):
+        return (Node(x, requires_grad=False),), False
+    return tuple(n if isinstance(n, Node) else Node(n, requires_grad=False) for n in x), True
+
+def _gather(values, stacked):
+    return np.array(values, dtype=float) if stacked else values[0]
+
+def _scatter(grad, stacked):
+    return list(grad) if stacked else [grad]
+
+def _logsumexp_grads(arg, values, g):
+    # the gradient of logsumexp is softmax
+    axis, stacked = arg
+    z = _gather(values, stacked)
+    p = np.exp(z - np.expand_dims(_logsumexp(z, axis), axis))
+    return _scatter(p * np.expand_dims(g, axis), stacked)
+
+def _softmax_cross_entropy_value(arg, values):
+    axis, count, logits_stacked, targets_stacked = arg
+    z, t = _gather(values[:count], logits_stacked), _gather(values[count:], targets_stacked)
+    return float(-np.sum(t * _log_softmax(z, axis)))
+
+def _softmax_cross_entropy_grads(arg, values, g):
+    axis, count, logits_stacked, targets_stacked = arg
+    z, t = _gather(values[:count], logits_stacked), _gather(values[count:], targets_stacked)
+    log_p = _log_softmax(z, axis)
+    # d/dz = softmax(z) * sum(t) - t, which is softmax(z) - t for one-hot targets
+    dz = (np.exp(log_p) * np.sum(t, axis=axis, keepdims=True) - t) * g
+    return _scatter(dz, logits_stacked) + _scatter(-log_p * g, targets_stacked)
+
+def _fused(value, children, op, arg, grads_fn):
+    if not (_grad_mode.enabled and any(n.recorded for n in children)):
+        return _value_node(value)
+    next_node = Node(value, 0.0, children, op)
+    next_node.arg = arg
+    def propagate():
+        grads = grads_fn(arg, [n.x for n in children], next_node.grad)
+        for n, grad in zip(children, grads):
+            if n.requires_grad:
+                n.grad += grad
+    next_node.propagate_fn = propagate
+    return next_node
+
+def logsumexp(x, axis=-1):
+    # log(sum(exp(x))) over axis as one node, stable for large inputs.
+    nodes, stacked = _vector_operand(x)
+    arg = (axis, stacked)
+    return _fused(_logsumexp(_gather([n.x for n in nodes], stacked), axis), nodes, 'logsumexp', arg,
+                  _logsumexp_grads)
+
+def softmax_cross_entropy(logits, targets, axis=-1):
+    # Cross-entropy between softmax(logits) and target probabilities (e.g. one-hot
+    # rows), summed over every sample, as one node whose gradient is softmax - targets.
+    # Computed from log-softmax, so large logits cannot overflow.
+    logit_nodes, logits_stacked = _vector_operand(logits)
+    target_nodes, targets_stacked = _vector_operand(targets)
+    children = logit_nodes + target_nodes
+    arg = (axis, len(logit_nodes), logits_stacked, targets_stacked)
+    value = _softmax_cross_entropy_value(arg, [n.x for n in children])
+    return _fused(value, children, 'softmax_cross_entropy', arg, _softmax_cross_entropy_grads)
+
+def node_sum(nodes):
+    # Fused n-ary sum: one node instead of a chain of binary adds.
+    nodes = [n if isinstance(n, Node) else Node(n, requires_grad=False) for n in nodes]
+    value = sum(n.x for n in nodes)
+    if not (_grad_mode.enabled and any(n.recorded for n in nodes)):
+        return _value_node(value)
+    next_node = Node(value, 0.0, nodes, 'add_n')
+    def propagate():
+        g = next_node.grad
+        for n in nodes:
+            if n.requires_grad:
+                n.grad += _unbroadcast(g, n.x)
+    next_node.propagate_fn = propagate
+    return next_node
+
+def _values_only(fn, values):
+    with no_grad():
+        return [y.x for y in fn([Node(value) for value in values])]
+
+def checkpoint(fn, inputs):
+    # Runs fn, which maps a list of Nodes to a list of Nodes, keeping only its outputs.
+    # The segment's forward pass records no graph; the graph is built by running fn
+    # again when backprop reaches the segment, trading one extra forward for memory.
+    inputs = [x if isinstance(x, Node) else Node(x, requires_grad=False) for x in inputs]
+    values = _values_only(fn, [x.x for x in inputs])
+    if not _grad_mode.enabled:
+        return [Node(value) for value in values]
+    # fn may use parameters that are not among its inputs, so the segment always requires grad
+    segment = Node(values, 0.0, inputs, 'checkpoint', requires_grad=True)
+    segment.arg = fn
+    outputs = []
+    for k, value in enumerate(values):
+        output = Node(value, 0.0, (segment,), 'item')
+        output.arg = k
+        outputs.append(output)
+    def propagate():
+        replay_inputs = [Node(x.x, requires_grad=x.requires_grad) for x in inputs]
+        Node.dot(fn(replay_inputs), [y.grad for y in outputs]).backprop()
+        for x, replay_input in zip(inputs, replay_inputs):
+            if x.requires_grad:
+                x.grad += replay_input.grad
+    segment.propagate_fn = propagate
+    return outputs
+
+def hvp(f, x, v):
+    # Hessian-vector product by forward-over-reverse: each input carries a GradNode
+    # seeded with its component of v, so the reverse pass computes gradients whose
+    # tangents are H @ v, at a small constant multiple of the cost of one gradient.
+    inputs = [Node(GradNode(float(xi), float(vi))) for xi, vi in zip(np.ravel(x), np.ravel(v))]
+    f(inputs).backprop()
+    return np.array([node.grad.dx if isinstance(node.grad, GradNode) else 0.0 for node in inputs])
+
+def _is_dead_relu(node):
+    # True when the ReLU's input is <= 0 everywhere, so it passes no gradient on
+    x = node.children[0].x
+    if isinstance(x, np.ndarray):
+        return not (x > 0).any()
+    return isinstance(x, (int, float)) and x <= 0
+
+def _constant_key(value):
+    if isinstance(value, (int, float)):
+        return ('constant', value)
+    return ('constant', id(value))
+
+def optimize(root, wrt=None):
+    # Rebuilds the graph below root for one backward pass, returning the new root and
+    # a report of what was removed. Leaves outside wrt (default: every leaf that
+    # requires grad) become constants, so any subgraph that only depends on them is
+    # folded into a value. Nodes with the same op, argument and operands are merged,
+    # and ReLUs whose input is <= 0 everywhere are replaced by constants, dropping the
+    # branch below them. Gradients still land in the original wrt leaves. The values
+    # of pruned ReLUs are fixed, so the optimized graph must not be replayed.
+    order = root._topo_order()
+    wanted = {leaf for leaf in order if leaf.op is None and leaf.requires_grad} if wrt is None else set(wrt)
+    new = {}
+    memo = {}
+    report = {'before': len(order), 'folded': 0, 'merged': 0, 'pruned': 0}
+    for node in order:
+        if node.op is None:
+            if node in wanted:
+                new[node] = node
+                continue
+            key = _constant_key(node.x)
+            if key not in memo:
+                memo[key] = node if not node.recorded else Node(node.x, requires_grad=False)
+            new[node] = memo[key]
+            continue
+        children = [new[child] for child in node.children]
+        ids = [id(child) for child in children]
+        if node.op in ('add', 'mul'):
+            ids.sort()  # commutative
+        arg = node.arg
+        try:
+            key = (node.op, arg, tuple(ids))
+            hash(key)
+        except TypeError:
+            key = (node.op, id(arg), tuple(ids))
+        if key in memo:
+            new[node] = memo[key]
+            report['merged'] += 1
+            continue
+        if node.op == 'relu' and children[0].requires_grad and _is_dead_relu(node):
+            new[node] = memo[key] = Node(node.x, requires_grad=False)
+            report['pruned'] += 1
+            continue
+        rebuilt = _REBUILD[node.op](node, *children)
+        if node.op != 'checkpoint' and rebuilt.op is None:
+            report['folded'] += 1
+        new[node] = memo[key] = rebuilt
+    new_root = new[root]
+    report['after'] = len(new_root._topo_order())
+    report['removed'] = report['before'] - report['after']
+    return new_root, report
+
+# Each op rebuilt on new operand Nodes, used by optimize
+_REBUILD = {
+    'add': lambda node, a, b: a + b,
+    'add_n': lambda node, *nodes: node_sum(nodes),
+    'mul': lambda node, a, b: a * b,
+    'div': lambda node, a, b: a / b,
+    'pow': lambda node, a: a ** node.arg,
+    'neg': lambda node, a: -a,
+    'matmul': lambda node, a, b: a @ b,
+    'dot': lambda node, *nodes: Node.dot(nodes[:len(nodes) // 2], nodes[len(nodes) // 2:]),
+    'sum': lambda node, a: a.sum(*node.arg),
+    'relu': lambda node, a: a.relu(),
+    'checkpoint': lambda node, *inputs: checkpoint(node.arg, inputs),
+    'item': lambda node, outputs: outputs[node.arg],
+    'sin': lambda node, a: sin(a),
+    'cos': lambda node, a: cos(a),
+    'log': lambda node, a: log(a),
+    'exp': lambda node, a: exp(a),
+    'tanh': lambda node, a: tanh(a),
+    'sigmoid': lambda node, a: sigmoid(a),
+    'logsumexp': lambda node, *nodes: logsumexp(nodes if node.arg[1] else nodes[0], node.arg[0]),
+    'softmax_cross_entropy': lambda node, *nodes: softmax_cross_entropy(
+        nodes[:node.arg[1]] if node.arg[2] else nodes[0],
+        nodes[node.arg[1]:] if node.arg[3] else nodes[node.arg[1]], node.arg[0]),
+}
+
+# Value of each op recomputed from its operands' values, used by Node.replay
+_FORWARD = {
+    'add': lambda node, a, b: a + b,
+    'add_n': lambda node, *values: sum(values),
+    'mul': lambda node, a, b: a * b,
+    'div': lambda node, a, b: a / b,
+    'pow': lambda node, a: a ** node.arg,
+    'neg': lambda node, a: -a,
+    'matmul': lambda node, a, b: a @ b,
+    'dot': lambda node, *values: sum(x * w for x, w in zip(values[:len(values) // 2], values[len(values) // 2:])),
+    'sum': lambda node, a: np.sum(a, axis=node.arg[0], keepdims=node.arg[1]),
+    'relu': lambda node, a: _relu(a),
+    'checkpoint': lambda node, *inputs: _values_only(node.arg, inputs),
+    'item': lambda node, a: a[node.arg],
+    'sin': lambda node, a: np.sin(a),
+    'cos': lambda node, a: np.cos(a),
+    'log': lambda node, a: np.log(a),
+    'exp': lambda node, a: np.exp(a),
+    'tanh': lambda node, a: np.tanh(a),
+    'sigmoid': lambda node, a: _sigmoid(a),
+    'logsumexp': lambda node, *values: _logsumexp(_gather(values, node.arg[1]), node.arg[0]),
+    'softmax_cross_entropy': lambda node, *values: _softmax_cross_entropy_value(node.arg, values),
+}
@@ -0,0 +1,194 @@
+import builtins
+import math
+import numpy as np
+from autograd_backward import (Node, _unbroadcast, _sigmoid, _logsumexp, _gather, _logsumexp_grads,
+                               _softmax_cross_entropy_value, _softmax_cross_entropy_grads)
+
+def _matmul_operands(a, b, g):
+    # Same rule as Node.__matmul__: promote vectors to matrices so one rule covers
+    # every 1-D/2-D case, then reshape the gradients back.
+    a, b, g = np.asarray(a), np.asarray(b), np.asarray(g)
+    a2 = a.reshape(1, -1) if a.ndim == 1 else a
+    b2 = b.reshape(-1, 1) if b.ndim == 1 else b
+    return a, b, a2, b2, g.reshape(a2.shape[0], b2.shape[1])
+
+def _matmul_grad_a(a, b, g):
+    a, b, a2, b2, g2 = _matmul_operands(a, b, g)
+    return (g2 @ b2.T).reshape(a.shape)
+
+def _matmul_grad_b(a, b, g):
+    a, b, a2, b2, g2 = _matmul_operands(a, b, g)
+    return (a2.T @ g2).reshape(b.shape)
+
+def _sum_grad(g, shape, axis, keepdims):
+    if axis is not None and not keepdims:
+        g = np.expand_dims(g, axis)
+    return np.broadcast_to(g, shape)
+
+def _is_scalar(value):
+    return isinstance(value, (int, float))
+
+# Forward expression of each op, from its node and the names of its operands
+_FORWARD_SOURCE = {
+    'add': lambda node, a, b: f"{a} + {b}",
+    'add_n': lambda node, *names: " + ".join(names),
+    'mul': lambda node, a, b: f"{a} * {b}",
+    'div': lambda node, a, b: f"{a} / {b}",
+    'pow': lambda node, a: f"{a} ** {node.arg!r}",
+    'neg': lambda node, a: f"-{a}",
+    'matmul': lambda node, a, b: f"{a} @ {b}",
+    'dot': lambda node, *names: " + ".join(f"{x} * {w}" for x, w in zip(names[:len(names) // 2], names[len(names) // 2:])),
+    'sum': lambda node, a: f"np.sum({a}, axis={node.arg[0]!r}, keepdims={node.arg[1]!r})",
+    'relu': lambda node, a: (f"({a} if {a} > 0 else 0.0)" if _is_scalar(node.x)
+                             else f"np.where({a} > 0, {a}, 0.0)"),
+    'sin': lambda node, a: f"{'math' if _is_scalar(node.x) else 'np'}.sin({a})",
+    'cos': lambda node, a: f"{'math' if _is_scalar(node.x) else 'np'}.cos({a})",
+    'log': lambda node, a: f"{'math' if _is_scalar(node.x) else 'np'}.log({a})",
+    'exp': lambda node, a: f"{'math' if _is_scalar(node.x) else 'np'}.exp({a})",
+    'tanh': lambda node, a: f"{'math' if _is_scalar(node.x) else 'np'}.tanh({a})",
+    'sigmoid': lambda node, a: f"_sigmoid({a})",
+    'logsumexp': lambda node, *names: f"_logsumexp(_gather(({', '.join(names)},), {node.arg[1]!r}), {node.arg[0]!r})",
+    'softmax_cross_entropy': lambda node, *names: f"_softmax_cross_entropy_value({node.arg!r}, ({', '.join(names)},))",
+}
+
+def _binary_grads(node, a, b, g, grad_a, grad_b):
+    # wrap in _unbroadcast only where the traced shapes show broadcasting happened
+    left, right = node.children
+    shape = np.shape(node.x)
+    if np.shape(left.x) != shape:
+        grad_a = f"_unbroadcast({grad_a}, {a})"
+    if np.shape(right.x) != shape:
+        grad_b = f"_unbroadcast({grad_b}, {b})"
+    return [grad_a, grad_b]
+
+# Gradient expression for each operand of each op, from the node, its name, the
+# name of its gradient and the operand names
+_BACKWARD_SOURCE = {
+    'add': lambda node, y, g, a, b: _binary_grads(node, a, b, g, g, g),
+    'add_n': lambda node, y, g, *names: [g if np.shape(child.x) == np.shape(node.x) else f"_unbroadcast({g}, {name})"
+                                      for child, name in zip(node.children, names)],
+    'mul': lambda node, y, g, a, b: _binary_grads(node, a, b, g, f"{b} * {g}", f"{a} * {g}"),
+    'div': lambda node, y, g, a, b: _binary_grads(node, a, b, g, f"{g} / {b}", f"-{a} / ({b} ** 2) * {g}"),
+    'pow': lambda node, y, g, a: [f"{node.arg!r} * {a} ** {node.arg - 1!r} * {g}"],
+    'neg': lambda node, y, g, a: [f"-{g}"],
+    'matmul': lambda node, y, g, a, b: [f"_matmul_grad_a({a}, {b}, {g})", f"_matmul_grad_b({a}, {b}, {g})"],
+    'dot': lambda node, y, g, *names: ([f"{w} * {g}" for w in names[len(names) // 2:]] +
+                                    [f"{x} * {g}" for x in names[:len(names) // 2]]),
+    'sum': lambda node, y, g, a: [f"_sum_grad({g}, {np.shape(node.children[0].x)!r}, {node.arg[0]!r}, {node.arg[1]!r})"],
+    'relu': lambda node, y, g, a: ([f"({g} if {a} > 0 else 0.0)"] if _is_scalar(node.x) else [f"({a} > 0) * {g}"]),
+    'sin': lambda node, y, g, a: [f"{'math' if _is_scalar(node.x) else 'np'}.cos({a}) * {g}"],
+    'cos': lambda node, y, g, a: [f"-{'math' if _is_scalar(node.x) else 'np'}.sin({a}) * {g}"],
+    'log': lambda node, y, g, a: [f"{g} / {a}"],
+    'exp': lambda node, y, g, a: [f"{y} * {g}"],
+    'tanh': lambda node, y, g, a: [f"(1 - {y} ** 2) * {g}"],
+    'sigmoid': lambda node, y, g, a: [f"{y} * (1 - {y}) * {g}"],
+}
+
+# Fused ops whose operand gradients come from one helper call, as in their propagate
+_BACKWARD_HELPERS = {
+    'logsumexp': '_logsumexp_grads',
+    'softmax_cross_entropy': '_softmax_cross_entropy_grads',
+}
+
+def _generate(f, inputs):
+    # Traces f once on Node leaves and returns the source of forward(x) and
+    # value_and_grad(x) as straight-line code, plus the constants they refer to.
+    leaves = [Node(value) for value in inputs]
+    root = f(leaves)
+    if not isinstance(root, Node):
+        root = Node(root, requires_grad=False)
+    names = {leaf: f"x{i}" for i, leaf in enumerate(leaves)}
+    constants = {}
+    body = []
+    order = root._topo_order()
+    for i, node in enumerate(order):
+        if node in names:
+            continue
+        if node.op is None:
+            value = node.x
+            if _is_scalar(value) and math.isfinite(value):
+                names[node] = repr(float(value)) if isinstance(value, float) else repr(value)
+            else:
+                names[node] = f"c{i}"
+                constants[names[node]] = value
+            continue
+        if node.op not in _FORWARD_SOURCE:
+            raise ValueError(f"cannot compile op '{node.op}'")
+        names[node] = f"v{i}"
+        body.append(f"    v{i} = {_FORWARD_SOURCE[node.op](node, *[names[child] for child in node.children])}")
+    arguments = ", ".join(names[leaf] for leaf in leaves)
+    unpack = [f"    {arguments}, = x"] if leaves else []
+    forward = ["def forward(x):", *unpack, *body, f"    return {names[root]}"]
+
+    # Reverse pass: the first contribution to a gradient assigns it, later ones add
+    # to it; gradients of constants are never computed.
+    grads = {root: f"g{order.index(root)}"}
+    backward = [f"    {grads[root]} = " + ("1.0" if _is_scalar(root.x) else f"np.ones_like({names[root]})")]
+    for i, node in reversed(list(enumerate(order))):
+        if node.op is None or node not in grads:
+            continue
+        children = node.children
+        operands = [names[child] for child in children]
+        if node.op in _BACKWARD_HELPERS:
+            backward.append(f"    t{i} = {_BACKWARD_HELPERS[node.op]}({node.arg!r}, ({', '.join(operands)},), {grads[node]})")
+            expressions = [f"t{i}[{k}]" for k in range(len(children))]
+        else:
+            expressions = _BACKWARD_SOURCE[node.op](node, names[node], grads[node], *operands)
+        for child, expression in zip(children, expressions):
+            if not child.requires_grad:
+                continue
+            if child in grads:
+                backward.append(f"    {grads[child]} = {grads[child]} + {expression}")
+            else:
+                grads[child] = f"g{order.index(child)}"
+                backward.append(f"    {grads[child]} = {expression}")
+    results = [grads.get(leaf, "0.0" if _is_scalar(leaf.x) else f"np.zeros_like({names[leaf]})") for leaf in leaves]
+    value_and_grad = ["def value_and_grad(x):", *unpack, *body, *backward,
+                      f"    return {names[root]}, [{', '.join(results)}]"]
+    return "\n".join(forward) + "\n\n" + "\n".join(value_and_grad) + "\n", constants
+
+def _signature(inputs):
+    return tuple(('scalar',) if _is_scalar(value) else (type(value), np.shape(value), np.result_type(value))
+                 for value in inputs)
+
+class CompiledFunction:
+    # f traced into straight-line Python, one version per input signature (the
+    # number of inputs and the type, shape and dtype of each). Tracing records a
+    # single path through f, so f must not branch on its inputs' values.
+    def __init__(self, f):
+        self.f = f
+        self._cache = {}
+
+    def _compiled(self, inputs):
+        signature = _signature(inputs)
+        compiled = self._cache.get(signature)
+        if compiled is None:
+            source, constants = _generate(self.f, inputs)
+            namespace = {'np': np, 'math': math, '_unbroadcast': _unbroadcast, '_sum_grad': _sum_grad,
+                         '_matmul_grad_a': _matmul_grad_a, '_matmul_grad_b': _matmul_grad_b,
+                         '_sigmoid': _sigmoid, '_logsumexp': _logsumexp, '_gather': _gather,
+                         '_logsumexp_grads': _logsumexp_grads,
+                         '_softmax_cross_entropy_value': _softmax_cross_entropy_value,
+                         '_softmax_cross_entropy_grads': _softmax_cross_entropy_grads, **constants}
+            exec(builtins.compile(source, f"<compiled {getattr(self.f, '__name__', 'f')}>", 'exec'), namespace)
+            compiled = self._cache[signature] = (namespace['forward'], namespace['value_and_grad'], source)
+        return compiled
+
+    def __call__(self, inputs):
+        return self._compiled(inputs)[0](inputs)
+
+    def value_and_grad(self, inputs):
+        # f(inputs) and the gradient with respect to every input, in input order
+        return self._compiled(inputs)[1](inputs)
+
+    def grad(self, inputs):
+        return self.value_and_grad(inputs)[1]
+
+    def source(self, inputs):
+        return self._compiled(inputs)[2]
+
+def compile(f):
+    # f maps a list of Nodes to a Node, as for hvp. Returns a CompiledFunction:
+    #     fast = compile(f)
+    #     value, grads = fast.value_and_grad([1.0, 2.0])
+    return CompiledFunction(f)
@@ -3,7 +3,8 @@ import numpy as np
 class GradNode:
     def __init__(self, x, dx = 1.0):
         self.x = x
-        self.dx = dx
+        # dx may be a single tangent or an ndarray of tangents pushed through together
+        self.dx = np.asarray(dx, dtype=float) if isinstance(dx, (list, tuple)) else dx
     def _to_node(self, other):
         if isinstance(other, GradNode):
             return other
@@ -34,6 +35,21 @@ class GradNode:
         return GradNode(self.x ** power, power * (self.x ** (power - 1)) * self.dx)
     def __neg__(self):
         return GradNode(-self.x, -self.dx)
+    def __gt__(self, other):
+        return self.x > (other.x if isinstance(other, GradNode) else other)
+    def __lt__(self, other):
+        return self.x < (other.x if isinstance(other, GradNode) else other)
+    # numpy ufuncs such as np.sin call these when given a GradNode
+    def sin(self):
+        return sin(self)
+    def cos(self):
+        return cos(self)
+    def exp(self):
+        return exp(self)
+    def log(self):
+        return log(self)
+    def tanh(self):
+        return tanh(self)
     def __repr__(self):
         return f"Node(x={self.x}, dx={self.dx})"
 
@@ -57,3 +73,26 @@ def log(x):
         return GradNode(np.log(x.x), (1 / x.x) * x.dx)
     return np.log(x)
 
+def tanh(x):
+    if isinstance(x, GradNode):
+        y = np.tanh(x.x)
+        return GradNode(y, (1 - y ** 2) * x.dx)
+    return np.tanh(x)
+
+def jacobian(f, x):
+    # Seed input i with the i-th unit tangent, so one evaluation of f carries the
+    # derivatives w.r.t. every input at once. f takes the list of inputs and returns
+    # one output (Jacobian row of shape (n,)) or a list of outputs (shape (m, n)).
+    x = np.asarray(x, dtype=float).ravel()
+    n = len(x)
+    tangents = np.eye(n)
+    outputs = f([GradNode(x[i], tangents[i]) for i in range(n)])
+    if isinstance(outputs, (list, tuple)):
+        return np.array([_tangents(y, n) for y in outputs])
+    return _tangents(outputs, n)
+
+def _tangents(y, n):
+    if isinstance(y, GradNode):
+        return np.broadcast_to(y.dx, (n,)).astype(float)
+    # an output that does not depend on the inputs
+    return np.zeros(n)
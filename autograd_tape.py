@@ -0,0 +1,149 @@
+import math
+from array import array
+
+# Opcodes stored on the tape
+LEAF, ADD, MUL, DIV, POW, NEG, SIN, COS, LOG, RELU = range(10)
+
+class Tape:
+    # Records every op as one entry in flat arrays instead of a Node object with a
+    # child set and a propagate closure. Entry i holds its opcode, the tape indices
+    # of its operands and its value; gradients live in a parallel array.
+    def __init__(self):
+        self.ops = array('b')
+        self.lhs = array('l')
+        self.rhs = array('l')
+        self.values = array('d')
+        self.grads = array('d')
+
+    def __len__(self):
+        return len(self.ops)
+
+    def _push(self, op, lhs, rhs, value):
+        self.ops.append(op)
+        self.lhs.append(lhs)
+        self.rhs.append(rhs)
+        self.values.append(value)
+        return TapeNode(self, len(self.ops) - 1)
+
+    def var(self, x):
+        return self._push(LEAF, -1, -1, x)
+
+    def clear(self):
+        # Drop every entry so the tape can be reused for the next step.
+        del self.ops[:], self.lhs[:], self.rhs[:], self.values[:], self.grads[:]
+
+    def backprop(self, root):
+        ops, lhs, rhs, values = self.ops, self.lhs, self.rhs, self.values
+        grads = array('d', bytes(8 * len(ops)))
+        grads[root] = 1.0
+        for i in range(root, -1, -1):
+            g = grads[i]
+            if g == 0.0:
+                continue
+            op = ops[i]
+            if op == LEAF:
+                continue
+            a = lhs[i]
+            if op == ADD:
+                grads[a] += g
+                grads[rhs[i]] += g
+            elif op == MUL:
+                b = rhs[i]
+                grads[a] += values[b] * g
+                grads[b] += values[a] * g
+            elif op == DIV:
+                b = rhs[i]
+                grads[a] += g / values[b]
+                grads[b] += -values[a] / (values[b] ** 2) * g
+            elif op == POW:
+                power = values[rhs[i]]
+                grads[a] += power * (values[a] ** (power - 1)) * g
+            elif op == NEG:
+                grads[a] -= g
+            elif op == SIN:
+                grads[a] += math.cos(values[a]) * g
+            elif op == COS:
+                grads[a] += -math.sin(values[a]) * g
+            elif op == LOG:
+                grads[a] += g / values[a]
+            elif op == RELU:
+                if values[a] > 0:
+                    grads[a] += g
+        self.grads = grads
+
+class TapeNode:
+    # Lightweight handle to one tape entry, with the same interface as autograd_backward.Node.
+    __slots__ = ('tape', 'index')
+
+    def __init__(self, tape, index):
+        self.tape = tape
+        self.index = index
+
+    @property
+    def x(self):
+        return self.tape.values[self.index]
+
+    @property
+    def grad(self):
+        grads = self.tape.grads
+        return grads[self.index] if self.index < len(grads) else 0.0
+
+    def _to_index(self, other):
+        if isinstance(other, TapeNode):
+            return other.index
+        # this means other is a constant
+        return self.tape.var(other).index
+
+    def __add__(self, other):
+        b = self._to_index(other)
+        values = self.tape.values
+        return self.tape._push(ADD, self.index, b, values[self.index] + values[b])
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __mul__(self, other):
+        b = self._to_index(other)
+        values = self.tape.values
+        return self.tape._push(MUL, self.index, b, values[self.index] * values[b])
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        b = self._to_index(other)
+        values = self.tape.values
+        return self.tape._push(DIV, self.index, b, values[self.index] / values[b])
+    def __rtruediv__(self, other):
+        other = self.tape.var(other)
+        return other.__truediv__(self)
+
+    def __pow__(self, power):
+        b = self._to_index(power)
+        values = self.tape.values
+        return self.tape._push(POW, self.index, b, values[self.index] ** values[b])
+
+    def __neg__(self):
+        return self.tape._push(NEG, self.index, -1, -self.x)
+
+    def relu(self):
+        return self.tape._push(RELU, self.index, -1, max(self.x, 0.0))
+
+    def backprop(self):
+        self.tape.backprop(self.index)
+
+    def __repr__(self):
+        return f"TapeNode(x={self.x}, grad={self.grad})"
+
+def sin(node):
+    if isinstance(node, TapeNode):
+        return node.tape._push(SIN, node.index, -1, math.sin(node.x))
+    return math.sin(node)
+
+def cos(node):
+    if isinstance(node, TapeNode):
+        return node.tape._push(COS, node.index, -1, math.cos(node.x))
+    return math.cos(node)
+
+def log(node):
+    if isinstance(node, TapeNode):
+        return node.tape._push(LOG, node.index, -1, math.log(node.x))
+    return math.log(node)
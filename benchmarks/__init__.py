@@ -0,0 +1 @@
+from benchmarks.suite import measure, run, save, load, compare
@@ -0,0 +1,32 @@
+import argparse
+import sys
+from benchmarks import run, save, load, compare
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Benchmark the autograd engines and NeuralNet.')
+    parser.add_argument('--output', default='benchmarks.json', help='where to write the results')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='slowdown (as a fraction) that counts as a regression')
+    parser.add_argument('--quick', action='store_true', help='smaller sizes, for a fast smoke run')
+    args = parser.parse_args(argv)
+
+    results = run(quick=args.quick)
+    width = max(map(len, results))
+    for name, seconds in results.items():
+        print(f"{name:<{width}}  {seconds * 1e6:12.2f} us  {1 / seconds:14.1f} /s")
+    save(args.output, results)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, load(args.baseline), args.threshold)
+        for name, ratio in sorted(regressions.items()):
+            print(f"REGRESSION {name}: {ratio:.2f}x slower than baseline")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import json
+import math
+import platform
+import random
+import time
+import numpy as np
+from autograd_backward import Node, sin
+from autograd_forward import GradNode
+from autograd_forward import sin as forward_sin
+from autograd_compile import compile
+from neural_net import NeuralNet
+
+def measure(fn, repeat=5, number=1):
+    # Best of repeat runs of number calls, in seconds per call. The minimum is the
+    # least noisy estimate of what the code itself costs.
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+def _op_benchmarks(count):
+    results = {}
+    for kind, make, sine in (('Node', Node, sin), ('GradNode', GradNode, forward_sin)):
+        ops = {
+            'add': lambda a, b: a + b,
+            'mul': lambda a, b: a * b,
+            'div': lambda a, b: a / b,
+            'pow': lambda a, b: a ** 2,
+            'neg': lambda a, b: -a,
+            'sin': lambda a, b, sine=sine: sine(a),
+        }
+        if kind == 'Node':
+            ops['relu'] = lambda a, b: a.relu()
+        a, b = make(1.5), make(0.5)
+        for name, op in ops.items():
+            def run():
+                for _ in range(count):
+                    op(a, b)
+            results[f'op/{kind}/{name}'] = measure(run) / count
+    return results
+
+def _chain(depth):
+    x = Node(0.5)
+    y = x
+    for _ in range(depth):
+        y = y * 1.01 + 0.1
+    return x, y
+
+def _wide(width):
+    xs = [Node(random.random()) for _ in range(width)]
+    y = xs[0]
+    for x in xs[1:]:
+        y = y + x * x
+    return xs, y
+
+def _backprop_benchmarks(sizes):
+    results = {}
+    for size in sizes:
+        # build and backprop together, since backprop releases the graph
+        results[f'backprop/deep/{size}'] = measure(lambda: _chain(size)[1].backprop())
+        results[f'backprop/wide/{size}'] = measure(lambda: _wide(size)[1].backprop())
+    return results
+
+def _net_benchmarks(layer_sizes_list, batch_size):
+    results = {}
+    rng = np.random.default_rng(0)
+    for layer_sizes in layer_sizes_list:
+        random.seed(0)
+        name = 'x'.join(map(str, layer_sizes))
+        net = NeuralNet(layer_sizes)
+        inputs = [Node(v) for v in rng.random(layer_sizes[0])]
+        targets = [Node(v) for v in rng.random(layer_sizes[-1])]
+        results[f'net/{name}/train_step'] = measure(lambda: net.train(inputs, targets, 0.001))
+        step = net.trace_train_step()
+        sample, target = rng.random(layer_sizes[0]).tolist(), rng.random(layer_sizes[-1]).tolist()
+        results[f'net/{name}/traced_train_step'] = measure(lambda: step(sample, target, 0.001))
+        X, Y = rng.random((batch_size, layer_sizes[0])), rng.random((batch_size, layer_sizes[-1]))
+        results[f'net/{name}/train_batch_{batch_size}'] = measure(lambda: net.train_batch(X, Y, 0.001))
+        results[f'net/{name}/predict'] = measure(lambda: net.predict(X[0]), number=100)
+        results[f'net/{name}/predict_batch_{batch_size}'] = measure(lambda: net.predict(X), number=10)
+    return results
+
+def _mode_function(xs, sine):
+    # n inputs, one output: reverse mode needs one pass, forward mode needs n
+    y = 0.0
+    for i, x in enumerate(xs):
+        y = y + x * xs[i - 1] + sine(x)
+    return y
+
+def _mode_benchmarks(sizes):
+    results = {}
+    for n in sizes:
+        values = [random.random() for _ in range(n)]
+
+        def reverse():
+            xs = [Node(v) for v in values]
+            _mode_function(xs, sin).backprop()
+            return [x.grad for x in xs]
+
+        def forward():
+            return [_mode_function([GradNode(v, 1.0 if i == j else 0.0) for i, v in enumerate(values)], forward_sin).dx
+                    for j in range(n)]
+
+        def batched_forward():
+            tangents = np.eye(n)
+            return _mode_function([GradNode(v, tangents[i]) for i, v in enumerate(values)], forward_sin).dx
+
+        compiled = compile(lambda xs: _mode_function(xs, sin))
+        assert np.allclose(reverse(), forward()) and np.allclose(reverse(), batched_forward())
+        assert np.allclose(reverse(), compiled.grad(values))
+        results[f'modes/reverse/{n}'] = measure(reverse)
+        results[f'modes/forward/{n}'] = measure(forward)
+        results[f'modes/batched_forward/{n}'] = measure(batched_forward)
+        results[f'modes/compiled_reverse/{n}'] = measure(lambda: compiled.grad(values))
+    return results
+
+def run(quick=False):
+    # Runs every benchmark and returns {name: seconds per call}.
+    random.seed(0)
+    results = {}
+    results.update(_op_benchmarks(1000 if quick else 20000))
+    results.update(_backprop_benchmarks([10, 100] if quick else [10, 100, 1000, 10000]))
+    results.update(_net_benchmarks([[2, 4, 1], [16, 8, 4]] if quick else [[2, 8, 1], [16, 16, 4], [64, 32, 10], [196, 8, 10]],
+                                   batch_size=8 if quick else 64))
+    results.update(_mode_benchmarks([4, 16] if quick else [4, 16, 64]))
+    return results
+
+def save(path, results):
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+def compare(results, baseline, threshold=0.25):
+    # Benchmarks at least threshold (a fraction) slower than the baseline, as
+    # {name: current / baseline}. Benchmarks missing from either side are skipped.
+    regressions = {}
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        if reference and seconds > reference * (1 + threshold):
+            regressions[name] = seconds / reference
+    return regressions
@@ -0,0 +1,120 @@
+import gzip
+import mmap
+import os
+import queue
+import struct
+import threading
+import numpy as np
+
+# IDX type codes and the matching big-endian NumPy dtypes
+_IDX_DTYPES = {
+    0x08: np.dtype('>u1'),
+    0x09: np.dtype('>i1'),
+    0x0B: np.dtype('>i2'),
+    0x0C: np.dtype('>i4'),
+    0x0D: np.dtype('>f4'),
+    0x0E: np.dtype('>f8'),
+}
+
+def read_idx(path):
+    # Returns the array stored in an IDX file. Uncompressed files are memory-mapped,
+    # so the array is a read-only view of the file rather than a copy; .gz files are
+    # decompressed into memory.
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            buffer = f.read()
+    else:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    zeros, code, ndim = struct.unpack_from('>HBB', buffer, 0)
+    if zeros != 0 or code not in _IDX_DTYPES:
+        raise ValueError(f"{path} is not an IDX file")
+    shape = struct.unpack_from(f'>{ndim}I', buffer, 4)
+    return np.frombuffer(buffer, dtype=_IDX_DTYPES[code], count=int(np.prod(shape)),
+                         offset=4 + 4 * ndim).reshape(shape)
+
+def write_idx(path, array):
+    array = np.asarray(array)
+    for code, dtype in _IDX_DTYPES.items():
+        if array.dtype.kind == dtype.kind and array.dtype.itemsize == dtype.itemsize:
+            break
+    else:
+        raise ValueError(f"IDX cannot store {array.dtype}")
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wb') as f:
+        f.write(struct.pack(f'>HBB{array.ndim}I', 0, code, array.ndim, *array.shape))
+        f.write(array.astype(dtype, copy=False).tobytes())
+
+def _prefetch(generator, depth):
+    # Runs generator on a background thread, keeping up to depth items ready.
+    items = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in generator:
+                while not stop.is_set():
+                    try:
+                        items.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+            items.put(done)
+        except BaseException as error:
+            items.put(error)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def _batches(images, labels, batch_size, downsample, num_classes, shuffle, limit):
+    count = len(images) if limit is None else min(limit, len(images))
+    order = np.random.permutation(count) if shuffle else np.arange(count)
+    for start in range(0, count, batch_size):
+        batch = np.sort(order[start:start + batch_size])
+        X = images[batch].astype(np.float32) / 255.0
+        if downsample > 1:
+            n, h, w = X.shape
+            X = X[:, :h - h % downsample, :w - w % downsample]
+            X = X.reshape(n, h // downsample, downsample, w // downsample, downsample).mean(axis=(2, 4))
+        X = X.reshape(len(batch), -1)
+        Y = labels[batch].astype(np.int64)
+        if num_classes:
+            Y = np.eye(num_classes, dtype=np.float32)[Y]
+        yield X, Y
+
+def iterate_batches(images, labels, batch_size=32, downsample=1, num_classes=10, shuffle=False,
+                    limit=None, prefetch=2):
+    # Yields (X, Y) batches from (N, H, W) uint8 images and (N,) labels: X holds the
+    # pixels scaled to [0, 1], averaged over downsample x downsample blocks and
+    # flattened; Y holds one-hot rows, or the raw labels if num_classes is None.
+    # With prefetch > 0 the next batches are prepared on a background thread.
+    batches = _batches(images, labels, batch_size, downsample, num_classes, shuffle, limit)
+    return _prefetch(batches, prefetch) if prefetch else batches
+
+def _find(directory, name):
+    for candidate in (name, name + '.gz'):
+        path = os.path.join(directory, candidate)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"{name} not found in {directory}")
+
+def load_mnist(directory, train=True):
+    # Images and labels of the MNIST training or test split from the standard IDX
+    # files (optionally gzipped) in directory, e.g. ./data/MNIST/raw.
+    prefix = 'train' if train else 't10k'
+    images = read_idx(_find(directory, f'{prefix}-images-idx3-ubyte'))
+    labels = read_idx(_find(directory, f'{prefix}-labels-idx1-ubyte'))
+    return images, labels
@@ -1,29 +1,201 @@
 import random
 import math
-from autograd_backward import Node
+import struct
+import numpy as np
+from autograd_backward import Node, node_sum, checkpoint, no_grad, softmax_cross_entropy
+
+class Parameter(Node):
+    # A scalar Node whose value and gradient are one slot of a network's flat
+    # parameter and gradient arrays, so the arrays and the Node always agree.
+    def __init__(self, values, grads, index):
+        self._values = values
+        self._grads = grads
+        self._index = index
+        Node.__init__(self, values.item(index))
+
+    @property
+    def x(self):
+        return self._values.item(self._index)
+
+    @x.setter
+    def x(self, value):
+        self._values[self._index] = value
+
+    @property
+    def grad(self):
+        return self._grads.item(self._index)
+
+    @grad.setter
+    def grad(self, value):
+        self._grads[self._index] = value
 
 class Neuron:
-    def __init__(self, input_size):
-        self.weights = [Node(random.uniform(-0.1, 0.1)) for _ in range(input_size)]
-        self.bias = Node(0.1)
+    def __init__(self, input_size, weights=None, bias=None, activation='relu'):
+        # NeuralNet passes Parameter views into its flat buffers; a standalone
+        # neuron owns fresh Nodes. activation is 'relu' or 'linear'.
+        self.activation = activation
+        self._in_buffer = weights is not None
+        self._weights = weights if weights is not None else [Node(random.uniform(-0.1, 0.1)) for _ in range(input_size)]
+        self._bias = bias if bias is not None else Node(0.1)
+
+    # Weights of a neuron inside a NeuralNet live in the network's flat buffer, so
+    # assigning new weights or a new bias copies their values into it.
+    @property
+    def weights(self):
+        return self._weights
+
+    @weights.setter
+    def weights(self, nodes):
+        if not self._in_buffer:
+            self._weights = nodes
+            return
+        for w, node in zip(self._weights, nodes, strict=True):
+            w.x = node.x if isinstance(node, Node) else node
+
+    @property
+    def bias(self):
+        return self._bias
+
+    @bias.setter
+    def bias(self, node):
+        if not self._in_buffer:
+            self._bias = node
+            return
+        self._bias.x = node.x if isinstance(node, Node) else node
 
     def forward(self, inputs):
-        output = Node(0.0)
-        for x, w in zip(inputs, self.weights):
-            output = output + x * w
-        output = output + self.bias
-        return output.relu()
+        output = Node.dot(inputs, self.weights) + self.bias
+        return output.relu() if self.activation == 'relu' else output
+
+def _values(items):
+    if isinstance(items, np.ndarray):
+        return items
+    return [item.x if isinstance(item, Node) else item for item in items]
+
+# Losses take a list of output Nodes and targets for one sample, or a (B, outputs)
+# Node and target array for a batch, and return the total over the batch. The
+# other built-in loss is autograd_backward.softmax_cross_entropy.
+def squared_error(outputs, targets):
+    if isinstance(outputs, Node):
+        return ((outputs + (-targets)) ** 2).sum()
+    return node_sum([(outputs[i] + (- targets[i])) ** 2 for i in range(len(targets))])
+
+class TrainStep:
+    # flow plus the loss traced once into a fixed graph over placeholder inputs and
+    # targets. Each call writes new values into the placeholders and replays forward
+    # and backward over the same graph instead of rebuilding it.
+    def __init__(self, net):
+        self.net = net
+        # placeholders: constants whose new values replay picks up, with no gradient
+        self.inputs = [Node(0.0, requires_grad=False, placeholder=True) for _ in range(len(net.layers[0][0].weights))]
+        self.targets = [Node(0.0, requires_grad=False, placeholder=True) for _ in range(len(net.layers[-1]))]
+        self.loss = net.loss(net.flow(self.inputs), self.targets)
+
+    def __call__(self, inputs, targets, learning_rate=0.01, optimizer=None):
+        for node, value in zip(self.inputs, inputs):
+            node.x = value.x if isinstance(value, Node) else value
+        for node, value in zip(self.targets, targets):
+            node.x = value.x if isinstance(value, Node) else value
+        self.loss.replay()
+        self.loss.backprop(retain_graph=True)
+        self.net.apply_gradients(learning_rate, optimizer)
+        return self.loss.x
+
+# Saved model layout: magic, format version and layer count, the layer sizes as
+# uint32, zero padding to an 8-byte boundary, then the flat float64 parameters.
+_MODEL_MAGIC = b'AGNN'
+_MODEL_VERSION = 1
 
 class NeuralNet:
-    def __init__(self, layer_sizes):
-        self.layers = []
-        for i in range(len(layer_sizes) - 1):
-            layer = [Neuron(layer_sizes[i]) for _ in range(layer_sizes[i + 1])]
-            self.layers.append(layer)
+    def __init__(self, layer_sizes, checkpoint_every=None, parameters=None, loss=squared_error, output_activation=None):
+        # checkpoint_every: if set, flow keeps only the activations between segments of
+        # that many layers and recomputes each segment during backprop; about
+        # sqrt(number of layers) gives the best memory saving.
+        # parameters: an existing flat float64 array to use as the parameter buffer
+        # without copying (e.g. shared or memory-mapped); randomly initialized if None.
+        # loss: squared_error, softmax_cross_entropy or another function of that form.
+        # output_activation: 'relu' or 'linear' for the last layer. By default it is
+        # linear for softmax_cross_entropy, whose inputs are logits, and ReLU otherwise.
+        if output_activation is None:
+            output_activation = 'linear' if loss is softmax_cross_entropy else 'relu'
+        if output_activation not in ('relu', 'linear'):
+            raise ValueError(f"Unknown output activation {output_activation!r}")
+        self.checkpoint_every = checkpoint_every
+        self.loss = loss
+        self.output_activation = output_activation
+        self.layer_sizes = list(layer_sizes)
+        # All weights and biases live in one contiguous array, with a matching
+        # gradient array. Per layer: the (inputs, neurons) weight matrix in row-major
+        # order, then the biases. Layers and neurons see views into these arrays.
+        size = sum((n_in + 1) * n_out for n_in, n_out in zip(layer_sizes[:-1], layer_sizes[1:]))
+        if parameters is None:
+            parameters = np.empty(size)
+            initialize = True
+        else:
+            if parameters.shape != (size,) or parameters.dtype != np.float64:
+                raise ValueError(f"Expected a float64 parameter array of shape ({size},), got {parameters.dtype} {parameters.shape}")
+            initialize = False
+        self._parameters = parameters
+        self._gradients = np.zeros(size)
+        self._layer_views = []
+        self._layer_offsets = []
+        offset = 0
+        for n_in, n_out in zip(layer_sizes[:-1], layer_sizes[1:]):
+            w_offset, b_offset = offset, offset + n_in * n_out
+            offset = b_offset + n_out
+            W = self._parameters[w_offset:b_offset].reshape(n_in, n_out)
+            b = self._parameters[b_offset:offset]
+            self._layer_views.append((W, b, self._gradients[w_offset:b_offset].reshape(n_in, n_out),
+                                      self._gradients[b_offset:offset]))
+            self._layer_offsets.append((w_offset, b_offset))
+            if initialize:
+                for j in range(n_out):
+                    for i in range(n_in):
+                        W[i, j] = random.uniform(-0.1, 0.1)
+                    b[j] = 0.1
+        self._layers = None
+
+    @property
+    def layers(self):
+        # The neurons hold one Parameter per weight, which is slow to build for a large
+        # model and only needed by the per-sample paths (flow, train, TrainStep), so
+        # they are built on first use. The batch paths, infer and save only use the
+        # flat buffers, which keeps loading a saved model O(number of layers).
+        if self._layers is None:
+            self._layers = [self._build_layer(index) for index in range(len(self._layer_views))]
+        return self._layers
+
+    def _build_layer(self, index):
+        n_in, n_out = self.layer_sizes[index], self.layer_sizes[index + 1]
+        w_offset, b_offset = self._layer_offsets[index]
+        activation = self.output_activation if index == len(self._layer_views) - 1 else 'relu'
+        layer = []
+        for j in range(n_out):
+            weights = [Parameter(self._parameters, self._gradients, w_offset + i * n_out + j) for i in range(n_in)]
+            layer.append(Neuron(n_in, weights, Parameter(self._parameters, self._gradients, b_offset + j), activation))
+        return layer
+
+    def parameters(self):
+        # The live flat parameter array; updating it updates every neuron
+        return self._parameters
+
+    def gradients(self):
+        # The live flat gradient array accumulated by backprop
+        return self._gradients
 
     def flow(self, inputs):
         inputs = inputs.copy()
-        for layer in self.layers:
+        if not self.checkpoint_every:
+            return self._flow_layers(self.layers, inputs)
+        for start in range(0, len(self.layers), self.checkpoint_every):
+            segment = self.layers[start:start + self.checkpoint_every]
+            inputs = checkpoint(lambda xs, segment=segment: self._flow_layers(segment, xs), inputs)
+        return inputs
+
+    def _flow_layers(self, layers, inputs):
+        # wrap plain values once here rather than once per neuron inside Node.dot
+        inputs = [x if isinstance(x, Node) else Node(x, requires_grad=False) for x in inputs]
+        for layer in layers:
             outputs = []
             for neuron in layer:
                 output = neuron.forward(inputs)
@@ -31,27 +203,135 @@ class NeuralNet:
             inputs = outputs
         return inputs
     
-    def train(self, inputs, targets, learning_rate=0.01):
+    def train(self, inputs, targets, learning_rate=0.01, optimizer=None):
         flow_outputs = self.flow(inputs)
-        loss = sum((flow_outputs[i] + (- targets[i])) ** 2 for i in range(len(targets)))
+        loss = self.loss(flow_outputs, targets)
         loss.backprop()
-        for layer in self.layers:
-            for neuron in layer:
-                for i in range(len(neuron.weights)):
-                    neuron.weights[i].x -= learning_rate * neuron.weights[i].grad
-                    neuron.weights[i].grad = 0.0
-                neuron.bias.x -= learning_rate * neuron.bias.grad
-                neuron.bias.grad = 0.0
-    
+        self.apply_gradients(learning_rate, optimizer)
+
+    def apply_gradients(self, learning_rate, optimizer=None):
+        # With an optimizer (see optimizers.py) the update uses its own learning rate
+        # and state; otherwise it is a plain gradient descent step.
+        if optimizer is not None:
+            optimizer.step(self._parameters, self._gradients)
+        else:
+            self._parameters -= learning_rate * self._gradients
+        self._gradients[:] = 0.0
+
+    def _batch_gradients(self, X, Y):
+        # One vectorized forward and backward pass over a (B, inputs) batch. The loss
+        # is the per-sample loss averaged over the batch, so B = 1 matches train.
+        params = [(Node(W), Node(b)) for W, b, _, _ in self._layer_views]
+        outputs = X
+        for index, (W, b) in enumerate(params):
+            outputs = outputs @ W + b
+            if self._relu_after(index):
+                outputs = outputs.relu()
+        loss = self.loss(outputs, Y) / len(X)
+        loss.backprop()
+        return loss.x, [(W.grad, b.grad) for W, b in params]
+
+    def save(self, path):
+        header = _MODEL_MAGIC + struct.pack(f'<II{len(self.layer_sizes)}I', _MODEL_VERSION,
+                                            len(self.layer_sizes), *self.layer_sizes)
+        header += bytes(-len(header) % 8)
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(self._parameters.astype('<f8', copy=False).tobytes())
+
+    @classmethod
+    def load(cls, path, mmap=True, **options):
+        # With mmap the parameters are mapped straight from the file instead of read
+        # into memory, so loading is instant and processes share the page cache; the
+        # per-weight Parameters are only built if a per-sample path needs them.
+        # The mapping is copy-on-write: training the loaded model never changes the file.
+        # options (loss, output_activation, ...) are passed on to NeuralNet.
+        with open(path, 'rb') as f:
+            magic, version, count = struct.unpack('<4sII', f.read(12))
+            if magic != _MODEL_MAGIC or version != _MODEL_VERSION:
+                raise ValueError(f"{path} is not a saved NeuralNet (version {_MODEL_VERSION})")
+            layer_sizes = list(struct.unpack(f'<{count}I', f.read(4 * count)))
+        offset = 12 + 4 * count
+        offset += -offset % 8
+        size = sum((n_in + 1) * n_out for n_in, n_out in zip(layer_sizes[:-1], layer_sizes[1:]))
+        if mmap:
+            parameters = np.memmap(path, dtype='<f8', mode='c', offset=offset, shape=(size,))
+        else:
+            parameters = np.fromfile(path, dtype='<f8', count=size, offset=offset)
+        return cls(layer_sizes, parameters=parameters, **options)
+
+    def get_parameters(self):
+        return self._parameters.copy()
+
+    def get_gradients(self):
+        return self._gradients.copy()
+
+    def set_parameters(self, flat):
+        self._parameters[:] = flat
+
+    def batch_gradients(self, X, Y):
+        # Loss and flat gradient (same layout as get_parameters) of a batch
+        loss, grads = self._batch_gradients(X, Y)
+        return loss, np.concatenate([np.concatenate([dW.ravel(), db]) for dW, db in grads])
+
+    def train_batch(self, X, Y, learning_rate=0.01, optimizer=None):
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+        loss, grad = self.batch_gradients(X, Y)
+        if optimizer is not None:
+            optimizer.step(self._parameters, grad)
+        else:
+            self._parameters -= learning_rate * grad
+        return loss
+
+    def train_epochs(self, X, Y, epochs=1, batch_size=32, learning_rate=0.01, shuffle=True, optimizer=None):
+        # Runs train_batch over the dataset in mini-batches, reshuffled every epoch.
+        # Returns the average training loss of each epoch.
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+        losses = []
+        for epoch in range(epochs):
+            order = np.random.permutation(len(X)) if shuffle else np.arange(len(X))
+            total = 0.0
+            for start in range(0, len(X), batch_size):
+                batch = order[start:start + batch_size]
+                total += self.train_batch(X[batch], Y[batch], learning_rate, optimizer) * len(batch)
+            losses.append(total / len(X))
+        return losses
+
+    def trace_train_step(self):
+        return TrainStep(self)
+
     def train_multiple_times(self, inputs, targets, epochs=1000, learning_rate=0.01):
+        # the graph is identical every epoch, so trace it once and replay it
+        step = self.trace_train_step()
         for epoch in range(epochs):
-            self.train(inputs, targets, learning_rate)
+            step(inputs, targets, learning_rate)
     
-    def predict(self, inputs):
-        outputs = self.flow(inputs)
+    def infer(self, X):
+        # Graph-free forward pass on the parameter buffer: one matmul and ReLU per
+        # layer. X is one sample of shape (inputs,) or a batch of shape (B, inputs).
+        outputs = np.asarray(X, dtype=float)
+        for index, (W, b, _, _) in enumerate(self._layer_views):
+            outputs = outputs @ W + b
+            if self._relu_after(index):
+                outputs = np.maximum(outputs, 0.0)
         return outputs
 
+    def _relu_after(self, index):
+        return index < len(self._layer_views) - 1 or self.output_activation == 'relu'
+
+    def predict(self, inputs):
+        # An ndarray (one sample or a batch) gives an ndarray back; a list of Nodes or
+        # floats gives a list of leaf Nodes, as flow does, but without building a graph.
+        if isinstance(inputs, np.ndarray):
+            return self.infer(inputs)
+        return [Node(value) for value in self.infer(_values(inputs)).tolist()]
+
     def evaluate(self, inputs, targets):
-        outputs = self.flow(inputs)
-        loss = sum((outputs[i] + (- targets[i])) ** 2 for i in range(len(targets)))
-        return loss.x
+        # Loss of one sample, or the mean per-sample loss of a batch
+        outputs = self.infer(_values(inputs))
+        targets = np.asarray(_values(targets), dtype=float).reshape(outputs.shape)
+        with no_grad():
+            loss = self.loss(Node(outputs), targets).x
+        return float(loss) / (len(outputs) if outputs.ndim == 2 else 1)
@@ -0,0 +1,62 @@
+import numpy as np
+
+# Optimizers update a flat parameter vector in place from a flat gradient vector of the
+# same shape (see NeuralNet.get_parameters). Their state lives in arrays of that shape,
+# allocated on the first step, so every update is a few vectorized NumPy calls.
+
+class SGD:
+    def __init__(self, learning_rate=0.01, momentum=0.0, nesterov=False):
+        self.learning_rate = learning_rate
+        self.momentum = momentum
+        self.nesterov = nesterov
+        self.velocity = None
+
+    def step(self, params, grads):
+        if not self.momentum:
+            params -= self.learning_rate * grads
+            return
+        if self.velocity is None:
+            self.velocity = np.zeros_like(params)
+        self.velocity *= self.momentum
+        self.velocity += grads
+        if self.nesterov:
+            params -= self.learning_rate * (grads + self.momentum * self.velocity)
+        else:
+            params -= self.learning_rate * self.velocity
+
+class RMSProp:
+    def __init__(self, learning_rate=0.001, rho=0.9, eps=1e-8):
+        self.learning_rate = learning_rate
+        self.rho = rho
+        self.eps = eps
+        self.square_avg = None
+
+    def step(self, params, grads):
+        if self.square_avg is None:
+            self.square_avg = np.zeros_like(params)
+        self.square_avg *= self.rho
+        self.square_avg += (1 - self.rho) * grads * grads
+        params -= self.learning_rate * grads / (np.sqrt(self.square_avg) + self.eps)
+
+class Adam:
+    def __init__(self, learning_rate=0.001, beta1=0.9, beta2=0.999, eps=1e-8):
+        self.learning_rate = learning_rate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.eps = eps
+        self.m = None
+        self.v = None
+        self.t = 0
+
+    def step(self, params, grads):
+        if self.m is None:
+            self.m = np.zeros_like(params)
+            self.v = np.zeros_like(params)
+        self.t += 1
+        self.m *= self.beta1
+        self.m += (1 - self.beta1) * grads
+        self.v *= self.beta2
+        self.v += (1 - self.beta2) * grads * grads
+        # bias correction folded into the step size
+        step_size = self.learning_rate * np.sqrt(1 - self.beta2 ** self.t) / (1 - self.beta1 ** self.t)
+        params -= step_size * self.m / (np.sqrt(self.v) + self.eps)
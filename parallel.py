@@ -0,0 +1,254 @@
+import os
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from neural_net import NeuralNet
+
+def _worker(layer_sizes, loss, output_activation, params_name, grads_name, workers, rank, X, Y, conn):
+    # Each worker owns a NeuralNet whose parameter buffer is the shared memory itself.
+    # Per step it receives the indices of its share of the batch and writes its summed
+    # gradient into its own row of the shared gradient buffer.
+    params_shm = shared_memory.SharedMemory(name=params_name)
+    grads_shm = shared_memory.SharedMemory(name=grads_name)
+    params = np.ndarray((params_shm.size // 8,), dtype=np.float64, buffer=params_shm.buf)
+    grads = np.ndarray((workers, len(params)), dtype=np.float64, buffer=grads_shm.buf)
+    net = NeuralNet(layer_sizes, parameters=params, loss=loss, output_activation=output_activation)
+    try:
+        while True:
+            shard = conn.recv()
+            if shard is None:
+                break
+            if len(shard) == 0:
+                grads[rank] = 0.0
+                conn.send(0.0)
+                continue
+            loss, grad = net.batch_gradients(X[shard], Y[shard])
+            grads[rank] = grad * len(shard)
+            conn.send(loss * len(shard))
+    finally:
+        del net, params, grads
+        params_shm.close()
+        grads_shm.close()
+
+def _hogwild_worker(layer_sizes, loss, output_activation, params_name, counter_name, X, Y, epochs, batch_size, learning_rate, conn):
+    # Runs its own training loop over its data shard, reading and updating the shared
+    # parameters without any locking. Staleness of an update is the number of updates
+    # other workers applied between reading the parameters and writing the gradient.
+    params_shm = shared_memory.SharedMemory(name=params_name)
+    counter_shm = shared_memory.SharedMemory(name=counter_name)
+    params = np.ndarray((params_shm.size // 8,), dtype=np.float64, buffer=params_shm.buf)
+    counter = np.ndarray((1,), dtype=np.int64, buffer=counter_shm.buf)
+    net = NeuralNet(layer_sizes, parameters=params, loss=loss, output_activation=output_activation)
+    try:
+        updates, total_staleness, max_staleness = 0, 0, 0
+        losses = []
+        start_time = time.perf_counter()
+        for epoch in range(epochs):
+            order = np.random.permutation(len(X))
+            total = 0.0
+            for start in range(0, len(X), batch_size):
+                batch = order[start:start + batch_size]
+                seen = counter[0]
+                loss, grad = net.batch_gradients(X[batch], Y[batch])
+                params -= learning_rate * grad
+                staleness = int(counter[0] - seen)
+                counter[0] += 1
+                updates += 1
+                total_staleness += staleness
+                max_staleness = max(max_staleness, staleness)
+                total += loss * len(batch)
+            losses.append(total / max(len(X), 1))
+        conn.send({
+            'samples': epochs * len(X),
+            'updates': updates,
+            'seconds': time.perf_counter() - start_time,
+            'mean_staleness': total_staleness / max(updates, 1),
+            'max_staleness': max_staleness,
+            'losses': losses,
+        })
+    finally:
+        del net, params, counter
+        params_shm.close()
+        counter_shm.close()
+
+def hogwild_train(net, X, Y, workers=None, epochs=1, batch_size=1, learning_rate=0.01):
+    # Asynchronous lock-free SGD: every worker trains on its own shard and applies its
+    # updates straight to one shared parameter buffer. Returns a staleness and
+    # throughput report; the trained parameters are written back into net.
+    workers = workers or os.cpu_count()
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+    initial = net.get_parameters()
+    params_shm = shared_memory.SharedMemory(create=True, size=initial.nbytes)
+    counter_shm = shared_memory.SharedMemory(create=True, size=8)
+    params = np.ndarray(initial.shape, dtype=np.float64, buffer=params_shm.buf)
+    counter = np.ndarray((1,), dtype=np.int64, buffer=counter_shm.buf)
+    params[:] = initial
+    counter[0] = 0
+    conns, processes = [], []
+    try:
+        start_time = time.perf_counter()
+        for rank in range(workers):
+            parent_conn, child_conn = mp.Pipe()
+            process = mp.Process(target=_hogwild_worker, args=(net.layer_sizes, net.loss, net.output_activation, params_shm.name,
+                                                               counter_shm.name, X[rank::workers], Y[rank::workers], epochs,
+                                                               batch_size, learning_rate, child_conn), daemon=True)
+            process.start()
+            # only the worker holds its end now, so recv sees EOF if the worker dies
+            child_conn.close()
+            conns.append(parent_conn)
+            processes.append(process)
+        per_worker = [conn.recv() for conn in conns]
+        for process in processes:
+            process.join()
+        seconds = time.perf_counter() - start_time
+        net.set_parameters(params)
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for conn in conns:
+            conn.close()
+        del params, counter
+        for shm in (params_shm, counter_shm):
+            shm.close()
+            shm.unlink()
+
+    samples = sum(report['samples'] for report in per_worker)
+    updates = sum(report['updates'] for report in per_worker)
+    return {
+        'mode': 'hogwild',
+        'workers': workers,
+        'seconds': seconds,
+        'samples': samples,
+        'samples_per_second': samples / seconds,
+        'updates': updates,
+        'mean_staleness': sum(r['mean_staleness'] * r['updates'] for r in per_worker) / max(updates, 1),
+        'max_staleness': max(r['max_staleness'] for r in per_worker),
+        'losses': [sum(r['losses'][epoch] * r['samples'] for r in per_worker) / samples for epoch in range(epochs)],
+        'per_worker': per_worker,
+    }
+
+def train_parallel(net, X, Y, mode='sync', workers=None, epochs=1, batch_size=32, learning_rate=0.01,
+                   optimizer=None):
+    # Selects the parallel trainer: 'sync' averages every mini-batch across workers,
+    # 'hogwild' lets workers update shared parameters asynchronously. Both return the
+    # same report layout. An optimizer is only supported in 'sync' mode, where a
+    # single process owns the update.
+    if mode == 'hogwild':
+        if optimizer is not None:
+            raise ValueError("hogwild mode applies plain SGD updates and takes no optimizer")
+        return hogwild_train(net, X, Y, workers, epochs, batch_size, learning_rate)
+    if mode != 'sync':
+        raise ValueError(f"Unknown parallel training mode: {mode}")
+    start_time = time.perf_counter()
+    with DataParallelTrainer(net, X, Y, workers) as trainer:
+        losses = trainer.train_epochs(epochs, batch_size, learning_rate, optimizer=optimizer)
+        updates = epochs * -(-trainer.size // batch_size)
+        samples = epochs * trainer.size
+        workers = trainer.workers
+    seconds = time.perf_counter() - start_time
+    return {
+        'mode': 'sync',
+        'workers': workers,
+        'seconds': seconds,
+        'samples': samples,
+        'samples_per_second': samples / seconds,
+        'updates': updates,
+        'mean_staleness': 0.0,
+        'max_staleness': 0,
+        'losses': losses,
+    }
+
+class DataParallelTrainer:
+    # Synchronous data-parallel training of a NeuralNet across worker processes.
+    # The dataset and model shape are sent to the workers once; every step only
+    # passes batch indices, while parameters and gradients move through shared memory.
+    #     with DataParallelTrainer(net, X, Y, workers=4) as trainer:
+    #         trainer.train_epochs(epochs=10, batch_size=256)
+    def __init__(self, net, X, Y, workers=None):
+        self.net = net
+        self.workers = workers or os.cpu_count()
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+        self.size = len(X)
+        initial = net.get_parameters()
+        self._params_shm = shared_memory.SharedMemory(create=True, size=initial.nbytes)
+        self._grads_shm = shared_memory.SharedMemory(create=True, size=initial.nbytes * self.workers)
+        self.params = np.ndarray(initial.shape, dtype=np.float64, buffer=self._params_shm.buf)
+        self.grads = np.ndarray((self.workers, len(initial)), dtype=np.float64, buffer=self._grads_shm.buf)
+        self.params[:] = initial
+        self._conns = []
+        self._processes = []
+        try:
+            for rank in range(self.workers):
+                parent_conn, child_conn = mp.Pipe()
+                process = mp.Process(target=_worker, args=(net.layer_sizes, net.loss, net.output_activation, self._params_shm.name,
+                                                           self._grads_shm.name, self.workers, rank, X, Y, child_conn),
+                                     daemon=True)
+                process.start()
+                child_conn.close()
+                self._conns.append(parent_conn)
+                self._processes.append(process)
+        except BaseException:
+            self.close()
+            raise
+
+    def step(self, batch, learning_rate=0.01, optimizer=None):
+        # One synchronous update from the samples at the given indices
+        for conn, shard in zip(self._conns, np.array_split(batch, self.workers)):
+            conn.send(shard)
+        loss = sum(conn.recv() for conn in self._conns)
+        grad = self.grads.sum(axis=0) / len(batch)
+        if optimizer is not None:
+            optimizer.step(self.params, grad)
+        else:
+            self.params -= learning_rate * grad
+        return loss / len(batch)
+
+    def train_epochs(self, epochs=1, batch_size=32, learning_rate=0.01, shuffle=True, optimizer=None):
+        losses = []
+        for epoch in range(epochs):
+            order = np.random.permutation(self.size) if shuffle else np.arange(self.size)
+            total = 0.0
+            for start in range(0, self.size, batch_size):
+                batch = order[start:start + batch_size]
+                total += self.step(batch, learning_rate, optimizer) * len(batch)
+            losses.append(total / self.size)
+        self.net.set_parameters(self.params)
+        return losses
+
+    def close(self):
+        # Safe to call after a worker has died, or more than once; the shared memory
+        # is always released.
+        try:
+            for conn in self._conns:
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass  # the worker is already gone
+            for process in self._processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+        finally:
+            for conn in self._conns:
+                conn.close()
+            self._conns, self._processes = [], []
+            if self._params_shm is not None:
+                del self.params, self.grads
+                for shm in (self._params_shm, self._grads_shm):
+                    shm.close()
+                    shm.unlink()
+                self._params_shm = self._grads_shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
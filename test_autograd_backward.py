@@ -1,5 +1,8 @@
 import numpy as np
-from autograd_backward import Node, sin, cos, log
+import threading
+from autograd_backward import (Node, sin, cos, log, hvp, node_sum, track_memory, no_grad, profile, Hook, add_hook,
+                               remove_hook, optimize, exp, tanh, sigmoid, logsumexp, softmax_cross_entropy,
+                               ParallelScheduler)
 
 def check_grad(node, expected_val, test_name):
     try:
@@ -221,7 +224,451 @@ def test_multiple_inputs():
     assert z.grad == 4.0
     print("Success!\n")
 
+def test_tensor_ops():
+    print("--- Testing Tensor Nodes ---")
+    tolerance = 1e-6
+
+    # Broadcasting add/mul: y = sum(x * w + b), x is (2, 3), w is (3,), b is scalar
+    # dy/dx = w (per row), dy/dw = column sums of x, dy/db = number of elements
+    x_val = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+    w_val = np.array([0.5, -1.0, 2.0])
+    x = Node(x_val)
+    w = Node(w_val)
+    b = Node(0.25)
+    y = (x * w + b).sum()
+    y.backprop()
+    assert np.allclose(x.grad, np.tile(w_val, (2, 1)))
+    assert np.allclose(w.grad, x_val.sum(axis=0))
+    assert abs(b.grad - 6.0) < tolerance
+
+    # Division and power: y = sum(x / w) + sum(w ** 2)
+    # dy/dx = 1 / w, dy/dw = -sum(x, axis=0) / w^2 + 2w
+    x = Node(x_val)
+    w = Node(w_val)
+    y = (x / w).sum() + (w ** 2).sum()
+    y.backprop()
+    assert np.allclose(x.grad, np.tile(1 / w_val, (2, 1)))
+    assert np.allclose(w.grad, -x_val.sum(axis=0) / w_val ** 2 + 2 * w_val)
+
+    # Matmul layer: y = mean(relu(X @ W + b))
+    X_val = np.array([[1.0, -2.0], [0.5, 3.0], [-1.0, 1.0]])
+    W_val = np.array([[0.2, -0.4, 1.0], [0.7, 0.1, -0.3]])
+    b_val = np.array([0.1, -0.2, 0.3])
+    X = Node(X_val)
+    W = Node(W_val)
+    b = Node(b_val)
+    y = (X @ W + b).relu().mean()
+    y.backprop()
+    z = X_val @ W_val + b_val
+    g = (z > 0) / z.size
+    assert abs(y.x - np.maximum(z, 0.0).mean()) < tolerance
+    assert np.allclose(X.grad, g @ W_val.T)
+    assert np.allclose(W.grad, X_val.T @ g)
+    assert np.allclose(b.grad, g.sum(axis=0))
+
+    # Matrix @ vector and axis reductions
+    v = Node(np.array([1.0, 2.0]))
+    W = Node(W_val.T)
+    y = (W @ v).sum(axis=0)
+    y.backprop()
+    assert np.allclose(v.grad, W_val.T.sum(axis=0))
+    assert np.allclose(W.grad, np.tile([1.0, 2.0], (3, 1)))
+
+    # Elementwise functions on arrays
+    x = Node(np.array([0.5, 1.0, 2.0]))
+    y = (sin(x) + cos(x) + log(x)).sum()
+    y.backprop()
+    assert np.allclose(x.grad, np.cos(x.x) - np.sin(x.x) + 1 / x.x)
+    print("Tensor ops test passed\n")
+
+def test_deep_graph():
+    print("--- Testing Deep Graph ---")
+    # A chain far deeper than Python's recursion limit, like a wide Neuron.forward
+    x = Node(0.5)
+    y = x
+    for _ in range(20000):
+        y = y + x * 1.0
+    y.backprop(retain_graph=True)
+    assert abs(x.grad - 20001.0) < 1e-6
+
+    # A second backprop from the same root reuses the cached ordering
+    order = y._topo_order()
+    x.grad = 0.0
+    y.backprop(retain_graph=True)
+    assert y._topo_order() is order
+    assert abs(x.grad - 20001.0) < 1e-6
+    print("Deep graph test passed\n")
+
+def test_replay():
+    print("--- Testing Graph Replay ---")
+    # y = relu(x * w) ** 2, recorded at x = 2 and replayed at x = -3 and x = 4
+    x = Node(2.0)
+    w = Node(1.5)
+    y = (x * w).relu() ** 2
+    y.backprop(retain_graph=True)
+    assert abs(w.grad - 2 * (2.0 * 1.5) * 2.0) < 1e-6
+
+    # ReLU inactive after replay: no gradient flows
+    x.x, w.grad = -3.0, 0.0
+    y.replay()
+    y.backprop(retain_graph=True)
+    assert y.x == 0.0 and w.grad == 0.0
+
+    # ReLU active again
+    x.x, w.grad = 4.0, 0.0
+    y.replay()
+    y.backprop()
+    assert abs(y.x - 36.0) < 1e-6
+    assert abs(w.grad - 2 * (4.0 * 1.5) * 4.0) < 1e-6
+    print("Replay test passed\n")
+
+def test_fused_ops():
+    print("--- Testing Fused Dot and Sum ---")
+    # y = (x . w) * x0 + sum(x_i^2, b), with a plain float among the inputs
+    x = [Node(1.0), Node(-2.0), 3.0]
+    w = [Node(0.5), Node(0.25), Node(-1.0)]
+    b = Node(4.0)
+    d = Node.dot(x, w)
+    y = d * x[0] + node_sum([x[0] ** 2, x[1] ** 2, b])
+    # d is one node with all six operands, not a chain of muls and adds
+    assert len(d.children) == 6
+    y.backprop()
+    assert abs(d.x - (0.5 - 0.5 - 3.0)) < 1e-6
+    # dy/dx0 = w0 * x0 + d + 2 x0, dy/dx1 = w1 * x0 + 2 x1, dy/dw_i = x_i * x0
+    assert abs(x[0].grad - (0.5 + d.x + 2.0)) < 1e-6
+    assert abs(x[1].grad - (0.25 - 4.0)) < 1e-6
+    assert abs(w[2].grad - 3.0) < 1e-6
+    assert abs(b.grad - 1.0) < 1e-6
+    print("Fused ops test passed\n")
+
+def test_release_graph():
+    print("--- Testing Graph Release ---")
+    def build():
+        x = Node(1.0)
+        y = x
+        for _ in range(1000):
+            y = y * 1.0001 + x
+        return x, y
+
+    # The retained graph stays alive through the root
+    with track_memory() as retained:
+        x, y = build()
+        y.backprop(retain_graph=True)
+    assert retained.live_nodes > 3000
+    expected_grad = x.grad
+
+    # By default every intermediate is released once its gradient has been passed on
+    with track_memory() as released:
+        x, y = build()
+        expected = y.x
+        y.backprop()
+    assert released.live_nodes == 2, f"Graph not released: {released.live_nodes} nodes alive"
+    assert released.peak_nodes > 3000 and released.peak_bytes > 0
+    assert y.x == expected and abs(x.grad - expected_grad) < 1e-6
+
+    # a released graph cannot be backpropagated again, directly or through an
+    # order cached on another root, and keeps no cached order alive
+    x = Node(2.0)
+    y = x * 3
+    y.backprop(retain_graph=True)
+    z = y * y
+    z.backprop()
+    assert y._order is None and not y.children
+    for root in (y, z):
+        try:
+            root.backprop(retain_graph=True)
+            assert False, "Backprop through a released graph did not raise"
+        except RuntimeError:
+            pass
+    w = x * 2
+    v = w + 1
+    v.backprop(retain_graph=True)
+    w.backprop()
+    try:
+        v.backprop()
+        assert False, "Backprop through a stale cached order did not raise"
+    except RuntimeError:
+        pass
+    print("Graph release test passed\n")
+
+def test_no_grad():
+    print("--- Testing no_grad ---")
+    x = Node(2.0)
+    w = Node(np.array([1.0, -1.0]))
+    with no_grad():
+        y = node_sum([x * 3 + sin(x), (x / 4) ** 2, -log(x), Node.dot([x], [x]).relu()])
+        v = (w @ w + w.sum()).relu()
+    expected = 6 + np.sin(2.0) + 0.25 - np.log(2.0) + 4.0
+    assert abs(y.x - expected) < 1e-9 and v.x == 2.0
+    # values only: no graph was recorded
+    assert not y.children and y.op is None and not v.children
+
+    # the decorator form, nested inside a recording region
+    @no_grad()
+    def value_of(node):
+        return node * node + 1
+
+    z = value_of(x) + x * x
+    assert not z.children[0].children
+    z.backprop()
+    assert abs(x.grad - 4.0) < 1e-9
+
+    # a no_grad block on another thread does not stop recording on this one
+    entered, leave = threading.Event(), threading.Event()
+    def evaluate():
+        with no_grad():
+            entered.set()
+            leave.wait(5)
+    thread = threading.Thread(target=evaluate)
+    thread.start()
+    entered.wait(5)
+    x = Node(3.0)
+    y = x * x
+    y.backprop()
+    leave.set()
+    thread.join()
+    assert x.grad == 6.0
+    print("no_grad test passed\n")
+
+def test_hvp():
+    print("--- Testing Hessian-Vector Product ---")
+    # f(x, y) = x^2 * y + sin(x * y) + log(y)
+    # H = [[2y - y^2 sin(xy), 2x + cos(xy) - xy sin(xy)],
+    #      [2x + cos(xy) - xy sin(xy), -x^2 sin(xy) - 1/y^2]]
+    def f(v):
+        x, y = v
+        return x ** 2 * y + sin(x * y) + log(y)
+    x, y = 0.7, 1.3
+    s, c = np.sin(x * y), np.cos(x * y)
+    H = np.array([
+        [2 * y - y ** 2 * s, 2 * x + c - x * y * s],
+        [2 * x + c - x * y * s, -x ** 2 * s - 1 / y ** 2],
+    ])
+    v = np.array([0.4, -1.5])
+    assert np.allclose(hvp(f, [x, y], v), H @ v)
+    assert np.allclose(hvp(f, [x, y], [1.0, 0.0]), H[0])
+
+    # g(x, y) = tanh(x) * y, with t = tanh(x):
+    # H = [[-2t(1 - t^2) y, 1 - t^2], [1 - t^2, 0]]
+    t = np.tanh(x)
+    H = np.array([[-2 * t * (1 - t ** 2) * y, 1 - t ** 2], [1 - t ** 2, 0.0]])
+    assert np.allclose(hvp(lambda v: tanh(v[0]) * v[1], [x, y], v), H @ v)
+    print("HVP test passed\n")
+
+def test_profile():
+    print("--- Testing Profiling Hooks ---")
+    def build():
+        x = Node(0.5)
+        y = x
+        for _ in range(10):
+            y = sin(y * 2.0) + x
+        return x, y
+
+    x, y = build()
+    y.backprop()
+    expected = x.grad
+
+    with profile() as prof:
+        x, y = build()
+        y.backprop()
+        x2, y2 = build()
+        y2.backprop(retain_graph=True)
+    assert x.grad == expected and x2.grad == expected
+    # per build: 1 input leaf, 10 constant leaves for 2.0 and 10 each of mul, sin, add
+    assert prof.node_counts == {'leaf': 22, 'mul': 20, 'sin': 20, 'add': 20}
+    assert prof.propagate_counts == {'mul': 20, 'sin': 20, 'add': 20}
+    assert all(seconds > 0.0 for seconds in prof.propagate_seconds.values())
+    # 41 nodes per graph, and 3 edges per (mul, sin, add) step down to x
+    assert prof.backprops == [(41, 30), (41, 30)]
+    assert 'sin' in prof.summary()
+
+    # hooks are removed on exit, and custom hooks see the same events
+    class CountPropagates(Hook):
+        calls = 0
+        def on_propagate(self, node, seconds):
+            self.calls += 1
+    hook = add_hook(CountPropagates())
+    build()[1].backprop()
+    remove_hook(hook)
+    build()[1].backprop()
+    assert hook.calls == 30 and prof.propagate_counts['add'] == 20
+    print("Profiling hooks test passed\n")
+
+def test_requires_grad():
+    print("--- Testing requires_grad ---")
+    x = Node(2.0)
+    c = Node(3.0, requires_grad=False)
+    # ops on constants only are plain values: no children, nothing to propagate
+    k = sin(c) * 2.0 + c ** 2
+    assert k.op is None and not k.children and not k.requires_grad
+    with profile() as prof:
+        y = x * k + node_sum([x, c, 1.0]) + Node.dot([c, 4.0], [x, x])
+        y.backprop()
+    assert y.requires_grad
+    assert abs(x.grad - (k.x + 1.0 + 3.0 + 4.0)) < 1e-9
+    assert c.grad == 0.0 and k.grad == 0.0
+    assert prof.propagate_counts == {'mul': 1, 'add': 2, 'add_n': 1, 'dot': 1}
+
+    # constant batch inputs get no gradient, parameters still do
+    X = np.array([[1.0, 2.0], [3.0, 4.0]])
+    W = Node(np.array([[0.5], [0.25]]))
+    product = X @ W
+    assert not product.children[0].requires_grad
+    loss = (product.relu() + (-np.ones((2, 1)))).sum()
+    loss.backprop()
+    assert np.allclose(W.grad, X.T @ np.ones((2, 1))) and abs(loss.x - 1.5) < 1e-12
+
+    # placeholders: constants whose ops are recorded so replay sees new values,
+    # while backprop computes no gradient for them or anything built only from them
+    w = Node(2.0)
+    c = Node(1.0, requires_grad=False, placeholder=True)
+    scaled = c * 3
+    out = w * scaled + (-c)
+    assert scaled.op == 'mul' and not scaled.requires_grad and out.requires_grad
+    out.backprop(retain_graph=True)
+    c.x = 5.0
+    out.replay()
+    assert out.x == 25.0
+    out.backprop(retain_graph=True)
+    assert w.grad == 3.0 + 15.0 and c.grad == 0.0 and scaled.grad == 0.0
+    print("requires_grad test passed\n")
+
+def test_optimize():
+    print("--- Testing Graph Optimization ---")
+    def build(n):
+        x, y, c = Node(0.3), Node(1.2), Node(2.0)
+        terms = []
+        for _ in range(n):
+            s = sin(x * y) * (c * c + 1.0)   # c * c + 1.0 only depends on c
+            dead = (-(x * x) + -5.0).relu()   # always 0, passes no gradient
+            terms.append(s * (x + y) + dead * y)
+        return x, y, c, node_sum(terms)
+
+    x, y, c, root = build(10)
+    root.backprop()
+    expected = (x.grad, y.grad, c.grad)
+
+    x, y, c, root = build(10)
+    optimized, report = optimize(root, wrt=[x, y])
+    assert report['before'] == 154 and report['after'] == 12 and report['removed'] == 142
+    assert report['folded'] == 2 and report['pruned'] == 1 and report['merged'] == 9 * 13
+    assert abs(optimized.x - root.x) < 1e-9
+    optimized.backprop()
+    assert abs(x.grad - expected[0]) < 1e-9 and abs(y.grad - expected[1]) < 1e-9
+    assert c.grad == 0.0  # not in wrt
+
+    # without wrt every leaf that requires grad is kept
+    x, y, c, root = build(10)
+    optimized, report = optimize(root)
+    optimized.backprop()
+    assert report['folded'] == 0 and abs(c.grad - expected[2]) < 1e-9
+    print("Graph optimization test passed\n")
+
+def test_fused_activations():
+    print("--- Testing Fused Activations and Losses ---")
+    def finite_difference(f, values, eps=1e-6):
+        grads = []
+        for i in range(len(values)):
+            up, down = list(values), list(values)
+            up[i] += eps
+            down[i] -= eps
+            grads.append((f([Node(v) for v in up]).x - f([Node(v) for v in down]).x) / (2 * eps))
+        return grads
+
+    functions = [
+        lambda v: node_sum([exp(v[0]), tanh(v[1]), sigmoid(v[2]), sigmoid(v[1])]),
+        lambda v: logsumexp(v),
+        lambda v: softmax_cross_entropy(v, [0.0, 1.0, 0.0]),
+        lambda v: softmax_cross_entropy(v[:2] + [0.5], [0.2, v[2], 0.3]),
+    ]
+    for f in functions:
+        values = [0.3, -1.2, 2.0]
+        nodes = [Node(v) for v in values]
+        root = f(nodes)
+        assert len(root.children) <= 6  # one node, not a chain of elementary ones
+        root.backprop()
+        assert np.allclose([n.grad for n in nodes], finite_difference(f, values), atol=1e-6)
+
+    # stable for large inputs
+    assert abs(logsumexp([Node(1000.0), Node(1000.0)]).x - (1000.0 + np.log(2.0))) < 1e-9
+    assert softmax_cross_entropy([Node(1000.0), Node(-1000.0)], [0.0, 1.0]).x == 2000.0
+    assert sigmoid(Node(-1000.0)).x == 0.0 and sigmoid(Node(1000.0)).x == 1.0
+
+    # batched: one row of logits per sample, the gradient is softmax - targets
+    Z = Node(np.array([[1.0, 2.0, 3.0], [0.5, -0.5, 0.0]]))
+    Y = np.array([[0.0, 0.0, 1.0], [1.0, 0.0, 0.0]])
+    loss = softmax_cross_entropy(Z, Y)
+    loss.backprop(retain_graph=True)
+    p = np.exp(Z.x) / np.exp(Z.x).sum(axis=1, keepdims=True)
+    assert np.allclose(Z.grad, p - Y) and abs(loss.x + np.sum(Y * np.log(p))) < 1e-12
+    Z.x = Z.x * 2
+    loss.replay()
+    assert abs(loss.x - softmax_cross_entropy(Node(Z.x), Y).x) < 1e-12
+    print("Fused activations test passed\n")
+
+def test_parallel_scheduler():
+    print("--- Testing Parallel Backward Scheduler ---")
+    rng = np.random.default_rng(0)
+
+    def build_scalar():
+        # neurons of one layer share every input, and a node used twice (x * x)
+        xs = [Node(v) for v in rng.random(6)]
+        hidden = [Node.dot(xs, [Node(w) for w in rng.random(6) - 0.5]).relu() for _ in range(8)]
+        return xs, node_sum([h * h + sin(h) for h in hidden] + [xs[0] * xs[0]])
+
+    def build_array():
+        # independent branches over a shared input, each NumPy-heavy
+        x = Node(rng.random((64, 32)))
+        weights = [Node(rng.random((32, 32)) - 0.5) for _ in range(4)]
+        branches = [tanh(x @ w).sum() for w in weights]
+        return [x] + weights, node_sum(branches) + (x * x).sum()
+
+    for build in (build_scalar, build_array):
+        state = rng.bit_generator.state
+        serial_leaves, serial_root = build()
+        serial_root.backprop()
+        for min_size, retain_graph in ((0, False), (0, True), (100, False)):
+            rng.bit_generator.state = state
+            leaves, root = build()
+            with ParallelScheduler(workers=4, min_size=min_size) as scheduler:
+                root.backprop(retain_graph=retain_graph, scheduler=scheduler)
+            assert all(np.allclose(a.grad, b.grad, atol=1e-12) for a, b in zip(serial_leaves, leaves))
+            assert bool(root.children) == retain_graph
+
+    # Matmuls over a shared input, or a shared constant, run at the same time: each
+    # waits at a barrier that only opens once all four are running
+    h = Node(rng.random((64, 64)))
+    c = Node(rng.random((64, 64)), requires_grad=False)
+    weights = [Node(rng.random((64, 64))) for _ in range(4)]
+    products = [h @ weights[0], h @ weights[1], c @ weights[2], c @ weights[3]]
+    root = node_sum([p.sum() for p in products])
+    barrier = threading.Barrier(len(products), timeout=5)
+    for p in products:
+        def propagate(propagate_fn=p.propagate_fn):
+            barrier.wait()
+            propagate_fn()
+        p.propagate_fn = propagate
+    with ParallelScheduler(workers=len(products), min_size=1000) as scheduler:
+        root.backprop(retain_graph=True, scheduler=scheduler)
+    ones = np.ones((64, 64))
+    assert np.allclose(h.grad, ones @ (weights[0].x + weights[1].x).T)
+    assert np.allclose(weights[2].grad, c.x.T @ ones)
+    assert c.grad == 0.0
+    print("Parallel scheduler test passed\n")
+
 if __name__ == "__main__":
     run_comprehensive_tests()
 
-    test_multiple_inputs()
\ No newline at end of file
+    test_multiple_inputs()
+    test_tensor_ops()
+    test_deep_graph()
+    test_replay()
+    test_fused_ops()
+    test_release_graph()
+    test_no_grad()
+    test_hvp()
+    test_profile()
+    test_requires_grad()
+    test_optimize()
+    test_fused_activations()
+    test_parallel_scheduler()
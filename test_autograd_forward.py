@@ -1,5 +1,5 @@
 import numpy as np
-from autograd_forward import GradNode, sin, cos, exp, log
+from autograd_forward import GradNode, sin, cos, exp, log, jacobian
 
 def run_tests():
     print("Running Verification Tests...\n")
@@ -104,5 +104,36 @@ def run_tests():
 
     print("\nAll correctness checks passed!")
 
+def test_jacobian():
+    # f(x, y, z) = [x * y, sin(z) + x^2, exp(y) / z, 3]
+    # J = [[y, x, 0], [2x, 0, cos(z)], [0, exp(y) / z, -exp(y) / z^2], [0, 0, 0]]
+    def f(v):
+        x, y, z = v
+        return [x * y, sin(z) + x ** 2, exp(y) / z, 3.0]
+    x, y, z = 1.5, -0.5, 2.0
+    J = jacobian(f, [x, y, z])
+    expected = np.array([
+        [y, x, 0.0],
+        [2 * x, 0.0, np.cos(z)],
+        [0.0, np.exp(y) / z, -np.exp(y) / z ** 2],
+        [0.0, 0.0, 0.0],
+    ])
+    assert J.shape == (4, 3)
+    assert np.allclose(J, expected), f"Jacobian failed: Got {J}"
+
+    # Scalar output gives a gradient row: g(v) = sum(v_i^2) * log(v_0)
+    v = np.linspace(1.0, 3.0, 30)
+    def g(v):
+        total = 0.0
+        for vi in v:
+            total = total + vi ** 2
+        return total * log(v[0])
+    grad = jacobian(g, v)
+    expected = 2 * v * np.log(v[0])
+    expected[0] += np.sum(v ** 2) / v[0]
+    assert np.allclose(grad, expected), f"Gradient row failed: Got {grad}"
+    print("Test 5 (Batched Jacobian) Passed")
+
 if __name__ == "__main__":
     run_tests()
+    test_jacobian()
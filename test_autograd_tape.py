@@ -0,0 +1,59 @@
+import sys
+import numpy as np
+from autograd_tape import Tape, sin, cos, log
+from autograd_backward import Node
+
+def test_tape_ops():
+    tolerance = 1e-6
+    tape = Tape()
+
+    # y = x^2 + sin(x) + log(x) + 5/x
+    # dy/dx = 2x + cos(x) + 1/x - 5/x^2
+    x = tape.var(1.0)
+    y = x**2 + sin(x) + log(x) + 5/x
+    y.backprop()
+    assert abs(x.grad - (2 + np.cos(1) + 1 - 5)) < tolerance, f"Kitchen sink failed: Got {x.grad}"
+
+    # f(a, b) = -(a * b) / cos(b) + relu(a - 3) + relu(b)
+    tape.clear()
+    a = tape.var(2.0)
+    b = tape.var(0.5)
+    f = -(a * b) / cos(b) + (a + (-3.0)).relu() + b.relu()
+    f.backprop()
+    expected_a = -0.5 / np.cos(0.5)
+    expected_b = -2.0 * (np.cos(0.5) + 0.5 * np.sin(0.5)) / np.cos(0.5) ** 2 + 1.0
+    assert abs(a.grad - expected_a) < tolerance, f"Partial (a) failed: Got {a.grad}"
+    assert abs(b.grad - expected_b) < tolerance, f"Partial (b) failed: Got {b.grad}"
+    print("Tape ops test passed")
+
+def test_tape_matches_node_graph():
+    # A 64-input neuron built on both engines gives the same gradients
+    rng = np.random.default_rng(0)
+    inputs = rng.uniform(-1, 1, 64).tolist()
+    weights = rng.uniform(-1, 1, 64).tolist()
+
+    node_weights = [Node(w) for w in weights]
+    output = Node(0.0)
+    for x, w in zip(inputs, node_weights):
+        output = output + x * w
+    (output ** 2).backprop()
+
+    tape = Tape()
+    tape_weights = [tape.var(w) for w in weights]
+    output = tape.var(0.0)
+    for x, w in zip(inputs, tape_weights):
+        output = output + x * w
+    (output ** 2).backprop()
+
+    for node_w, tape_w in zip(node_weights, tape_weights):
+        assert abs(node_w.grad - tape_w.grad) < 1e-9
+    # every entry costs a few bytes per array instead of a Node, its dict and a child set
+    entry_bytes = sum(a.itemsize for a in (tape.ops, tape.lhs, tape.rhs, tape.values, tape.grads))
+    node = Node(0.0)
+    node_bytes = sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.children)
+    assert entry_bytes * 3 < node_bytes
+    print("Tape matches Node graph test passed")
+
+if __name__ == "__main__":
+    test_tape_ops()
+    test_tape_matches_node_graph()
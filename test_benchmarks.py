@@ -0,0 +1,21 @@
+import os
+import tempfile
+from benchmarks import measure, save, load, compare
+
+def test_compare():
+    baseline = {'op/Node/add': 1.0e-6, 'backprop/deep/100': 1.0e-3, 'removed': 1.0}
+    results = {'op/Node/add': 1.1e-6, 'backprop/deep/100': 2.0e-3, 'new': 5.0}
+    regressions = compare(results, baseline, threshold=0.25)
+    assert list(regressions) == ['backprop/deep/100'], f"Compare failed: Got {regressions}"
+    assert abs(regressions['backprop/deep/100'] - 2.0) < 1e-12
+    assert compare(results, baseline, threshold=1.5) == {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'baseline.json')
+        save(path, baseline)
+        assert load(path) == baseline
+    assert measure(lambda: None, repeat=2, number=10) >= 0.0
+    print("Benchmark compare test passed!")
+
+if __name__ == "__main__":
+    test_compare()
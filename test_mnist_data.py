@@ -0,0 +1,59 @@
+import os
+import tempfile
+import numpy as np
+from mnist_data import read_idx, write_idx, iterate_batches, load_mnist
+
+def make_fixture(directory, count=23, compress=False):
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, size=(count, 28, 28), dtype=np.uint8)
+    labels = rng.integers(0, 10, size=count, dtype=np.uint8)
+    suffix = '.gz' if compress else ''
+    write_idx(os.path.join(directory, 'train-images-idx3-ubyte' + suffix), images)
+    write_idx(os.path.join(directory, 'train-labels-idx1-ubyte' + suffix), labels)
+    return images, labels
+
+def test_read_idx():
+    with tempfile.TemporaryDirectory() as directory:
+        for compress in (False, True):
+            images, labels = make_fixture(directory, compress=compress)
+            loaded_images, loaded_labels = load_mnist(directory)
+            assert loaded_images.shape == (23, 28, 28) and loaded_images.dtype == np.uint8
+            assert np.array_equal(loaded_images, images) and np.array_equal(loaded_labels, labels)
+            del loaded_images, loaded_labels
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+
+        # other IDX element types round-trip with their big-endian encoding
+        path = os.path.join(directory, 'floats')
+        values = np.arange(6, dtype=np.float32).reshape(2, 3) / 3
+        write_idx(path, values)
+        assert np.array_equal(read_idx(path), values)
+    print("IDX read test passed!")
+
+def test_iterate_batches():
+    with tempfile.TemporaryDirectory() as directory:
+        images, labels = make_fixture(directory)
+        images, labels = load_mnist(directory)
+        batches = list(iterate_batches(images, labels, batch_size=10, downsample=2, prefetch=0))
+        assert [len(X) for X, _ in batches] == [10, 10, 3]
+        X, Y = batches[0]
+        assert X.shape == (10, 14 * 14) and Y.shape == (10, 10)
+        expected = images[:10].reshape(10, 14, 2, 14, 2).mean(axis=(2, 4)) / 255.0
+        assert np.allclose(X, expected.reshape(10, -1), atol=1e-6)
+        assert np.array_equal(Y.argmax(axis=1), labels[:10]) and np.all(Y.sum(axis=1) == 1)
+
+        # the prefetching generator yields the same batches
+        prefetched = list(iterate_batches(images, labels, batch_size=10, downsample=2, prefetch=2))
+        assert all(np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1]) for a, b in zip(batches, prefetched))
+        assert len(prefetched) == len(batches)
+
+        # a shuffled, limited epoch covers exactly the first limit samples
+        seen = np.concatenate([Y for _, Y in iterate_batches(images, labels, batch_size=4, num_classes=None,
+                                                              shuffle=True, limit=15)])
+        assert np.array_equal(np.sort(seen), np.sort(labels[:15]))
+        del images, labels
+    print("Batch iteration test passed!")
+
+if __name__ == "__main__":
+    test_read_idx()
+    test_iterate_batches()
@@ -1,7 +1,10 @@
 import math
+import os
 import random
-from neural_net import Neuron, NeuralNet
-from autograd_backward import Node
+import tempfile
+import numpy as np
+from neural_net import Neuron, NeuralNet, squared_error
+from autograd_backward import Node, track_memory, softmax_cross_entropy
 from neural_net import Neuron, NeuralNet
 
 def test_neuron_forward():
@@ -79,6 +82,180 @@ def test_neural_net_flow():
     assert abs(outputs[0].x - expected_output) < 1e-6, f"NeuralNet flow failed: Got {outputs[0].x}, Expected {expected_output}"
     print("NeuralNet flow test passed")
 
+def copy_weights(source, target):
+    for layer_a, layer_b in zip(source.layers, target.layers):
+        for neuron_a, neuron_b in zip(layer_a, layer_b):
+            for w_a, w_b in zip(neuron_a.weights, neuron_b.weights):
+                w_b.x = w_a.x
+            neuron_b.bias.x = neuron_a.bias.x
+
+def test_traced_train_step():
+    # Replaying a traced step must match rebuilding the graph for every sample,
+    # including samples that flip ReLU units on and off.
+    random.seed(0)
+    nn_rebuilt = NeuralNet([2, 4, 1])
+    nn_traced = NeuralNet([2, 4, 1])
+    copy_weights(nn_rebuilt, nn_traced)
+
+    step = nn_traced.trace_train_step()
+    samples = [([1.0, -2.0], [0.5]), ([-1.5, 0.5], [1.0]), ([0.3, 0.9], [0.0])] * 5
+    for inputs, targets in samples:
+        nn_rebuilt.train([Node(v) for v in inputs], targets, learning_rate=0.05)
+        step(inputs, targets, learning_rate=0.05)
+    # the placeholders are constants: no gradient is accumulated into them
+    assert all(node.grad == 0.0 for node in step.inputs + step.targets)
+
+    for layer_a, layer_b in zip(nn_rebuilt.layers, nn_traced.layers):
+        for neuron_a, neuron_b in zip(layer_a, layer_b):
+            for w_a, w_b in zip(neuron_a.weights, neuron_b.weights):
+                assert abs(w_a.x - w_b.x) < 1e-9, f"Traced step diverged: Got {w_b.x}, Expected {w_a.x}"
+            assert abs(neuron_a.bias.x - neuron_b.bias.x) < 1e-9
+    print("Traced train step test passed")
+
+def test_train_batch():
+    # A batch of one sample takes the same step as train
+    random.seed(1)
+    nn_single = NeuralNet([3, 5, 2])
+    nn_batch = NeuralNet([3, 5, 2])
+    copy_weights(nn_single, nn_batch)
+    inputs, targets = [0.5, -0.2, 0.9], [1.0, 0.3]
+    nn_single.train([Node(v) for v in inputs], [Node(v) for v in targets], learning_rate=0.1)
+    nn_batch.train_batch([inputs], [targets], learning_rate=0.1)
+    for layer_a, layer_b in zip(nn_single.layers, nn_batch.layers):
+        for neuron_a, neuron_b in zip(layer_a, layer_b):
+            for w_a, w_b in zip(neuron_a.weights, neuron_b.weights):
+                assert abs(w_a.x - w_b.x) < 1e-9, f"Batch step diverged: Got {w_b.x}, Expected {w_a.x}"
+            assert abs(neuron_a.bias.x - neuron_b.bias.x) < 1e-9
+
+    # Mini-batch epochs on y = x0 + x1 bring the loss down
+    np.random.seed(0)
+    X = np.random.uniform(0, 1, (256, 2))
+    Y = X.sum(axis=1)
+    nn = NeuralNet([2, 8, 1])
+    losses = nn.train_epochs(X, Y, epochs=30, batch_size=16, learning_rate=0.05)
+    assert losses[-1] < losses[0] / 4, f"Mini-batch training did not converge: {losses[0]} -> {losses[-1]}"
+    print("Train batch test passed")
+
+def test_checkpointed_flow():
+    # A 16-layer stack trained with and without checkpointing ends up with the same
+    # weights, while checkpointing keeps far fewer nodes alive at once.
+    random.seed(2)
+    sizes = [3] + [4] * 15 + [1]
+    nn_plain = NeuralNet(sizes)
+    nn_checkpointed = NeuralNet(sizes, checkpoint_every=4)
+    copy_weights(nn_plain, nn_checkpointed)
+    # keep every unit active so gradients reach the first layer
+    for nn in (nn_plain, nn_checkpointed):
+        for layer in nn.layers:
+            for neuron in layer:
+                for w in neuron.weights:
+                    w.x = abs(w.x)
+
+    inputs, targets = [0.5, 1.0, 0.25], [2.0]
+    with track_memory() as plain:
+        nn_plain.train([Node(v) for v in inputs], [Node(v) for v in targets], learning_rate=0.01)
+    with track_memory() as checkpointed:
+        nn_checkpointed.train([Node(v) for v in inputs], [Node(v) for v in targets], learning_rate=0.01)
+
+    for layer_a, layer_b in zip(nn_plain.layers, nn_checkpointed.layers):
+        for neuron_a, neuron_b in zip(layer_a, layer_b):
+            for w_a, w_b in zip(neuron_a.weights, neuron_b.weights):
+                assert abs(w_a.x - w_b.x) < 1e-12, f"Checkpointed step diverged: Got {w_b.x}, Expected {w_a.x}"
+            assert abs(neuron_a.bias.x - neuron_b.bias.x) < 1e-12
+    assert checkpointed.peak_nodes < plain.peak_nodes / 2, f"{checkpointed.peak_nodes} vs {plain.peak_nodes} peak nodes"
+    print("Checkpointed flow test passed")
+
+def test_flat_parameter_buffer():
+    nn = NeuralNet([2, 3, 1])
+    params = nn.parameters()
+    assert params.shape == ((2 + 1) * 3 + (3 + 1) * 1,)
+
+    # Neurons are views into the buffer: writes through either side are shared
+    params[0] = 0.75
+    assert nn.layers[0][0].weights[0].x == 0.75
+    nn.layers[1][0].bias.x = 2.0
+    assert params[-1] == 2.0
+    nn.layers[0][1].weights = [Node(0.25), Node(-0.25)]
+    assert params[1] == 0.25 and params[4] == -0.25
+
+    # backprop accumulates straight into the gradient buffer
+    loss = (nn.flow([Node(1.0), Node(2.0)])[0] + (-1.0)) ** 2
+    loss.backprop()
+    assert nn.gradients()[-1] == nn.layers[1][0].bias.grad != 0.0
+    nn.apply_gradients(0.1)
+    assert np.all(nn.gradients() == 0.0)
+
+    # A network built over an existing array uses it without copying
+    shared = nn.get_parameters()
+    nn_shared = NeuralNet([2, 3, 1], parameters=shared)
+    assert nn_shared.parameters() is shared
+    assert nn_shared.layers[0][0].weights[0].x == nn.layers[0][0].weights[0].x
+    print("Flat parameter buffer test passed")
+
+def test_float_inputs_wrapped_once():
+    # Plain float inputs become one constant Node each, shared by every neuron of the
+    # first layer, rather than one per neuron that reads them
+    random.seed(5)
+    nn = NeuralNet([196, 8, 10])
+    inputs, targets = [random.random() for _ in range(196)], [0.0] * 10
+    input_nodes = [Node(v) for v in inputs]
+    nn.layers  # build the Parameters outside the measured steps
+    with track_memory() as with_nodes:
+        nn.train(input_nodes, targets, learning_rate=0.0)
+    with track_memory() as with_floats:
+        nn.train(inputs, targets, learning_rate=0.0)
+    assert with_floats.peak_nodes - with_nodes.peak_nodes == len(inputs), \
+        f"{with_floats.peak_nodes} vs {with_nodes.peak_nodes} peak nodes"
+    print("Float inputs test passed")
+
+def test_save_load():
+    nn = NeuralNet([3, 5, 2])
+    inputs = [Node(0.5), Node(-1.0), Node(2.0)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "model.bin")
+        nn.save(path)
+
+        for mmap in (True, False):
+            loaded = NeuralNet.load(path, mmap=mmap)
+            assert loaded.layer_sizes == [3, 5, 2]
+            assert isinstance(loaded.parameters(), np.memmap) == mmap
+            assert np.array_equal(loaded.parameters(), nn.parameters())
+            for a, b in zip(nn.flow(inputs), loaded.flow(inputs)):
+                assert a.x == b.x
+
+        # training a mapped model leaves the file untouched
+        loaded = NeuralNet.load(path)
+        loaded.train_batch([[0.5, -1.0, 2.0]], [[1.0, 0.0]], learning_rate=0.5)
+        assert loaded._layers is None  # the batch path never builds the per-weight Parameters
+        assert not np.array_equal(loaded.parameters(), nn.parameters())
+        assert np.array_equal(NeuralNet.load(path, mmap=False).parameters(), nn.parameters())
+        del loaded
+    print("Save/load test passed")
+
+def test_graph_free_inference():
+    random.seed(3)
+    nn = NeuralNet([3, 6, 4, 2])
+    # keep units active so the comparison exercises every layer
+    nn.parameters()[:] = np.abs(nn.parameters())
+    samples = np.random.uniform(-1, 1, (10, 3))
+    targets = np.random.uniform(0, 1, (10, 2))
+
+    batch_outputs = nn.predict(samples)
+    assert batch_outputs.shape == (10, 2)
+    total_loss = 0.0
+    for sample, target, batch_output in zip(samples, targets, batch_outputs):
+        inputs = [Node(v) for v in sample]
+        flow_outputs = nn.flow(inputs)
+        predicted = nn.predict(inputs)
+        for flow_output, node, value in zip(flow_outputs, predicted, batch_output):
+            assert abs(flow_output.x - node.x) < 1e-12 and abs(flow_output.x - value) < 1e-12
+            assert not node.children
+        loss = nn.evaluate(inputs, [Node(v) for v in target])
+        assert abs(loss - squared_error(flow_outputs, target.tolist()).x) < 1e-12
+        total_loss += loss
+    assert abs(nn.evaluate(samples, targets) - total_loss / 10) < 1e-12
+    print("Graph-free inference test passed")
+
 def test_circle_visual_ascii(nn):
     print("\n--- Visualizing Decision Boundary (ASCII) ---")
     print("Legend: '.' = Inside Circle, '#' = Outside, ' ' = Unsure")
@@ -149,10 +326,78 @@ def train_for_inside_circle(nn, iteraton_count = 100, check_progress=False):
     print(f"Point (0.9, 0.9) [Target 0.0]: {pred_out:.4f}")
     print("-" * 30)
 
+def test_softmax_cross_entropy_loss():
+    # The per-sample, traced and batch paths agree with a cross-entropy loss too
+    random.seed(3)
+    nets = [NeuralNet([3, 4, 3], loss=softmax_cross_entropy) for _ in range(3)]
+    for nn in nets[1:]:
+        nn.set_parameters(nets[0].get_parameters())
+    inputs, targets = [0.5, -0.2, 0.9], [0.0, 1.0, 0.0]
+    nets[0].train([Node(v) for v in inputs], targets, learning_rate=0.5)
+    loss = nets[1].trace_train_step()(inputs, targets, learning_rate=0.5)
+    nets[2].train_batch([inputs], [targets], learning_rate=0.5)
+    assert np.allclose(nets[0].get_parameters(), nets[1].get_parameters(), atol=1e-12)
+    assert np.allclose(nets[0].get_parameters(), nets[2].get_parameters(), atol=1e-12)
+    assert abs(loss - np.log(3)) < 0.1  # near-uniform softmax before the step
+
+    # Separable three-class data: the mean cross-entropy falls well below log(3)
+    np.random.seed(1)
+    X = np.random.uniform(-1, 1, (300, 2))
+    labels = (X[:, 0] > 0).astype(int) + (X[:, 1] > 0.5)
+    Y = np.eye(3)[labels]
+    nn = NeuralNet([2, 16, 3], loss=softmax_cross_entropy)
+    losses = nn.train_epochs(X, Y, epochs=60, batch_size=20, learning_rate=0.5)
+    assert losses[-1] < losses[0] / 2, f"Cross-entropy training did not converge: {losses[0]} -> {losses[-1]}"
+    assert abs(nn.evaluate(X, Y) - losses[-1]) < 0.2
+    print("Softmax cross-entropy loss test passed")
+
+def test_output_activation():
+    # With cross-entropy the last layer is linear, so logits can go negative and a
+    # class whose pre-activation starts negative still gets a gradient
+    random.seed(4)
+    nn = NeuralNet([2, 4, 3], loss=softmax_cross_entropy)
+    assert nn.output_activation == 'linear' and NeuralNet([2, 4, 3]).output_activation == 'relu'
+    nn._layer_views[-1][1][1] = -5.0
+    inputs, targets = [0.3, -0.7], [0.0, 1.0, 0.0]
+    outputs = [node.x for node in nn.flow([Node(v) for v in inputs])]
+    assert outputs[1] < 0
+    assert np.allclose(nn.infer(inputs), outputs, atol=1e-12)
+    X, Y = np.array([inputs]), np.array([targets])
+    losses = nn.train_epochs(X, Y, epochs=50, batch_size=1, learning_rate=0.5)
+    assert nn._layer_views[-1][1][1] > -5.0
+    assert losses[-1] < 0.5, f"Loss stayed at {losses[-1]}"
+
+    # The per-sample, traced and batch paths agree on the linear output layer
+    nets = [NeuralNet([2, 4, 3], loss=softmax_cross_entropy) for _ in range(3)]
+    for other in nets:
+        other.set_parameters(nn.get_parameters())
+        other._layer_views[-1][1][1] = -5.0
+    nets[0].train([Node(v) for v in inputs], targets, learning_rate=0.5)
+    nets[1].trace_train_step()(inputs, targets, learning_rate=0.5)
+    nets[2].train_batch([inputs], [targets], learning_rate=0.5)
+    assert np.allclose(nets[0].get_parameters(), nets[1].get_parameters(), atol=1e-12)
+    assert np.allclose(nets[0].get_parameters(), nets[2].get_parameters(), atol=1e-12)
+
+    try:
+        NeuralNet([2, 1], output_activation='tanh')
+        assert False, "unknown activation accepted"
+    except ValueError:
+        pass
+    print("Output activation test passed")
+
 if __name__ == "__main__":
     test_neuron_forward()
     test_neuron_forward_relu_negative()
     test_neural_net_flow()
+    test_traced_train_step()
+    test_train_batch()
+    test_checkpointed_flow()
+    test_flat_parameter_buffer()
+    test_float_inputs_wrapped_once()
+    test_save_load()
+    test_graph_free_inference()
+    test_softmax_cross_entropy_loss()
+    test_output_activation()
 
     nn = NeuralNet([2, 8, 1])
     train_for_inside_circle(nn, iteraton_count=100, check_progress=True)
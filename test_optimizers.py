@@ -0,0 +1,71 @@
+import random
+import numpy as np
+from optimizers import SGD, RMSProp, Adam
+from neural_net import NeuralNet
+from autograd_backward import Node
+
+def test_optimizer_steps():
+    tolerance = 1e-12
+    grads = [np.array([1.0, -2.0]), np.array([0.5, 0.5])]
+
+    # Momentum: v = 0.9 v + g, p -= lr v
+    params = np.array([1.0, 1.0])
+    opt = SGD(0.1, momentum=0.9)
+    for g in grads:
+        opt.step(params, g)
+    v = 0.9 * grads[0] + grads[1]
+    expected = np.array([1.0, 1.0]) - 0.1 * grads[0] - 0.1 * v
+    assert np.allclose(params, expected, atol=tolerance), f"Momentum failed: Got {params}"
+
+    # Nesterov: p -= lr (g + momentum v)
+    params = np.array([1.0, 1.0])
+    opt = SGD(0.1, momentum=0.9, nesterov=True)
+    opt.step(params, grads[0])
+    assert np.allclose(params, 1.0 - 0.1 * (grads[0] + 0.9 * grads[0]), atol=tolerance)
+
+    # RMSProp first step: s = (1 - rho) g^2, p -= lr g / sqrt(s)
+    params = np.array([1.0, 1.0])
+    RMSProp(0.01, rho=0.9, eps=0.0).step(params, grads[0])
+    assert np.allclose(params, 1.0 - 0.01 * np.sign(grads[0]) / np.sqrt(0.1), atol=tolerance)
+
+    # Adam first step moves every parameter by the learning rate against its gradient
+    params = np.array([1.0, 1.0])
+    Adam(0.01, eps=0.0).step(params, grads[0])
+    assert np.allclose(params, 1.0 - 0.01 * np.sign(grads[0]), atol=tolerance)
+    print("Optimizer step test passed")
+
+def test_optimizers_minimize_quadratic():
+    # f(p) = sum(scale * (p - 3)^2) with badly scaled coordinates
+    scale = np.array([100.0, 1.0, 0.01])
+    for opt in (SGD(0.004, momentum=0.9), SGD(0.004, momentum=0.9, nesterov=True), RMSProp(0.05), Adam(0.1)):
+        params = np.zeros(3)
+        for _ in range(3000):
+            opt.step(params, 2 * scale * (params - 3.0))
+        assert np.allclose(params[:2], 3.0, atol=1e-2), f"{type(opt).__name__} failed: Got {params}"
+    print("Quadratic minimization test passed")
+
+def test_neural_net_with_optimizer():
+    # Adam on mini-batches beats plain SGD with the same number of epochs,
+    # and the scalar train path accepts an optimizer too
+    np.random.seed(0)
+    X = np.random.uniform(0, 1, (256, 2))
+    Y = X.sum(axis=1)
+    random.seed(0)
+    nn_sgd = NeuralNet([2, 8, 1])
+    nn_adam = NeuralNet([2, 8, 1])
+    nn_adam.set_parameters(nn_sgd.get_parameters())
+    sgd_losses = nn_sgd.train_epochs(X, Y, epochs=10, batch_size=16, learning_rate=0.01)
+    adam_losses = nn_adam.train_epochs(X, Y, epochs=10, batch_size=16, optimizer=Adam(0.01))
+    assert adam_losses[-1] < sgd_losses[-1], f"Adam {adam_losses[-1]} vs SGD {sgd_losses[-1]}"
+
+    opt = SGD(0.01, momentum=0.9)
+    before = nn_adam.get_parameters()
+    nn_adam.train([Node(0.2), Node(0.7)], [Node(0.9)], optimizer=opt)
+    assert not np.allclose(before, nn_adam.get_parameters())
+    assert np.all(nn_adam.get_gradients() == 0.0)
+    print("NeuralNet optimizer test passed")
+
+if __name__ == "__main__":
+    test_optimizer_steps()
+    test_optimizers_minimize_quadratic()
+    test_neural_net_with_optimizer()
@@ -0,0 +1,87 @@
+import random
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from neural_net import NeuralNet
+from parallel import DataParallelTrainer, train_parallel
+
+def failing_loss(outputs, targets):
+    raise ValueError("loss failed")
+
+def test_data_parallel_matches_single_process():
+    # Two workers splitting each batch take the same steps as one process
+    random.seed(0)
+    np.random.seed(0)
+    X = np.random.uniform(0, 1, (64, 3))
+    Y = np.stack([X.sum(axis=1), X[:, 0] - X[:, 2]], axis=1)
+    nn_single = NeuralNet([3, 6, 2])
+    nn_parallel = NeuralNet([3, 6, 2])
+    nn_parallel.set_parameters(nn_single.get_parameters())
+
+    single_losses = nn_single.train_epochs(X, Y, epochs=3, batch_size=16, learning_rate=0.05, shuffle=False)
+    with DataParallelTrainer(nn_parallel, X, Y, workers=2) as trainer:
+        parallel_losses = trainer.train_epochs(epochs=3, batch_size=16, learning_rate=0.05, shuffle=False)
+
+    assert np.allclose(single_losses, parallel_losses), f"Losses differ: {single_losses} vs {parallel_losses}"
+    assert np.allclose(nn_single.get_parameters(), nn_parallel.get_parameters())
+    print("Data parallel test passed")
+
+def test_hogwild():
+    # Lock-free asynchronous workers still bring the loss down, and the report
+    # accounts for every sample and update
+    random.seed(1)
+    np.random.seed(1)
+    X = np.random.uniform(0, 1, (200, 2))
+    Y = X.sum(axis=1)
+    nn = NeuralNet([2, 8, 1])
+    initial_loss = nn.batch_gradients(X, Y.reshape(-1, 1))[0]
+    report = train_parallel(nn, X, Y, mode='hogwild', workers=2, epochs=20, batch_size=4, learning_rate=0.05)
+    final_loss = nn.batch_gradients(X, Y.reshape(-1, 1))[0]
+
+    assert final_loss < initial_loss / 4, f"Hogwild training did not converge: {initial_loss} -> {final_loss}"
+    assert report['mode'] == 'hogwild' and report['samples'] == 20 * 200
+    assert report['updates'] == 2 * 20 * 25
+    assert report['samples_per_second'] > 0 and report['max_staleness'] >= report['mean_staleness'] >= 0
+    assert len(report['losses']) == 20
+    print("Hogwild test passed")
+
+def test_worker_failure_releases_resources():
+    # A worker that dies surfaces its broken pipe, and close still stops the other
+    # workers and unlinks the shared memory
+    X = np.random.uniform(0, 1, (8, 2))
+    Y = X.sum(axis=1)
+    trainer = DataParallelTrainer(NeuralNet([2, 3, 1], loss=failing_loss), X, Y, workers=2)
+    names = [trainer._params_shm.name, trainer._grads_shm.name]
+    try:
+        with trainer:
+            trainer.step(np.arange(8))
+        assert False, "Failing worker did not raise"
+    except EOFError:
+        pass
+    trainer.close()  # closing again is harmless
+    for name in names:
+        try:
+            shared_memory.SharedMemory(name=name).close()
+            assert False, f"Shared memory {name} was not unlinked"
+        except FileNotFoundError:
+            pass
+    print("Worker failure test passed")
+
+def test_hogwild_worker_failure():
+    # A hogwild worker that dies surfaces as EOFError instead of a hang, and no
+    # worker is left running
+    X = np.random.uniform(0, 1, (8, 2))
+    Y = X.sum(axis=1)
+    try:
+        train_parallel(NeuralNet([2, 3, 1], loss=failing_loss), X, Y, mode='hogwild', workers=1)
+        assert False, "Failing worker did not raise"
+    except EOFError:
+        pass
+    assert not mp.active_children()
+    print("Hogwild worker failure test passed")
+
+if __name__ == "__main__":
+    test_data_parallel_matches_single_process()
+    test_hogwild()
+    test_worker_failure_releases_resources()
+    test_hogwild_worker_failure()